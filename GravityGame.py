@@ -1,9 +1,25 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # 배치 결과(JSON)가 stdout에 깨끗하게 나오도록
 import certifi
+import numpy as np
 import pygame
 import random
 import sys
-import os
+import gc
+import csv
+import math
+import time
+import json
+import sqlite3
+import base64
+import struct
+import argparse
+import threading
+import uuid
 import requests # 서버 통신용
+from collections import namedtuple, OrderedDict, deque
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 def resource_path(relative_path):
     """ PyInstaller로 생성된 .app 내부 및 일반 환경의 리소스 경로를 가져옵니다. """
@@ -16,25 +32,89 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
-# 초기화
-pygame.init()
-
 # --- 리소스 경로 설정 ---
 font_path = resource_path("NotoSansKR-Regular.ttf")
 image_path = resource_path("space_background.jpg")
 
 # --- 화면 설정 ---
+# 창은 init_display()에서 만듭니다. 헤드리스 시뮬레이션은 화면 없이 모듈을 import 합니다.
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-clock = pygame.time.Clock()
-pygame.display.set_caption("Gravity Game - Dense Galaxy")
+BACKGROUND_CACHE_SIZE = 4 # 화면 크기별로 늘려 둔 배경을 몇 개까지 보관할지
+BACKGROUND_FALLBACK_COLOR = (0, 0, 30) # 배경 이미지를 읽는 중이거나 없을 때
+RESIZE_DEBOUNCE = 0.2 # 창 크기 변경 이벤트가 이 시간(초) 동안 더 오지 않을 때 한 번만 반영합니다
+screen = clock = resources = None
 
-# --- 이미지 로드 ---
-space_bg = pygame.image.load(image_path).convert()
-space_bg = pygame.transform.scale(space_bg, (WIDTH, HEIGHT))
+class ResourceLoader:
+    """ 배경 이미지를 작업 스레드에서 디코딩해 원본을 메모리에 들고 있고, 화면 크기별로 늘린 배경을
+    LRU로 cache_size개까지 보관합니다. 창은 이미지를 기다리지 않고 바로 뜨며, 다 읽기 전에는 background()가
+    None을 돌려줍니다. Surface 변환(convert)은 화면이 있는 메인 스레드에서 처음 쓸 때 합니다. """
+    def __init__(self, image_path, cache_size=BACKGROUND_CACHE_SIZE):
+        self.image_path, self.cache_size = image_path, cache_size
+        self.backgrounds = OrderedDict()
+        self._decoded = self._source = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._load, name="ResourceLoader", daemon=True)
 
-# --- 폰트 설정 ---
-game_font = pygame.font.Font(font_path, 30)
+    def start(self):
+        self.thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """ 이미지를 다 읽을 때까지 기다립니다. 끝났으면 True. """
+        return self.ready.wait(timeout)
+
+    def _load(self):
+        try:
+            self._decoded = pygame.image.load(self.image_path)
+        except (pygame.error, OSError) as e:
+            print(f"배경 이미지를 불러오지 못했습니다: {e}")
+        self.ready.set()
+
+    def background(self, size):
+        """ size에 맞춰 늘린 배경 Surface. 아직 읽는 중이거나 읽지 못했으면 None. """
+        background = self.backgrounds.get(size)
+        if background is not None:
+            self.backgrounds.move_to_end(size)
+            return background
+        if self._source is None:
+            if not self.ready.is_set() or self._decoded is None: return None
+            self._source = self._decoded.convert() if pygame.display.get_surface() is not None else self._decoded
+        background = self.backgrounds[size] = pygame.transform.scale(self._source, size)
+        if len(self.backgrounds) > self.cache_size: self.backgrounds.popitem(last=False)
+        return background
+
+class ResizeDebouncer:
+    """ 창을 끌어서 크기를 바꿀 때 쏟아지는 VIDEORESIZE 이벤트를 모았다가, delay초 동안 더 오지 않으면
+    마지막 크기 하나만 돌려줍니다. """
+    def __init__(self, delay=RESIZE_DEBOUNCE):
+        self.delay, self.size, self.deadline = delay, None, 0.0
+
+    def push(self, size, now=None):
+        self.size, self.deadline = size, (time.monotonic() if now is None else now) + self.delay
+
+    def poll(self, now=None):
+        if self.size is None or (time.monotonic() if now is None else now) < self.deadline: return None
+        size, self.size = self.size, None
+        return size
+
+def init_display():
+    global screen, clock, resources
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+    clock = pygame.time.Clock()
+    pygame.display.set_caption("Gravity Game - Dense Galaxy")
+    resources = ResourceLoader(image_path).start()
+
+def resize_window(size, fullscreen=False):
+    global WIDTH, HEIGHT, screen
+    WIDTH, HEIGHT = size
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+
+def draw_background(surface):
+    """ 지금 화면 크기(WIDTH, HEIGHT)에 맞춘 배경을 그립니다. 배경을 아직 읽는 중이면 단색으로 채웁니다. """
+    background = resources.background((WIDTH, HEIGHT)) if resources is not None else None
+    if background is None: surface.fill(BACKGROUND_FALLBACK_COLOR)
+    else: surface.blit(background, (0, 0))
 
 # 색상
 BLACK = (0, 0, 0)
@@ -47,6 +127,17 @@ RED_COLOR = (255, 50, 50)
 GREEN_COLOR = (100, 255, 100)
 BLUE_COLOR = (100, 100, 255)
 
+# 행성 종류별 (질량, 색상, 중력 세기)
+PLANET_TYPES = {
+    "red": (5000, RED_COLOR, 1500),
+    "blue": (3000, BLUE_COLOR, 500),
+    "green": (4000, GREEN_COLOR, 1000),
+}
+PLANET_TYPE_NAMES = list(PLANET_TYPES)
+# 종류 번호로 바로 찾는 질량·중력 세기 표 (PlanetSystem은 행성마다 종류 번호만 들고 있습니다)
+PLANET_MASSES = np.array([PLANET_TYPES[name][0] for name in PLANET_TYPE_NAMES], dtype=float)
+PLANET_GRAVITY_STRENGTHS = np.array([PLANET_TYPES[name][2] for name in PLANET_TYPE_NAMES], dtype=float)
+
 SHIP_COLOR = (255, 255, 100)
 EXPLOSION_COLOR = (255, 100, 100)
 WARNING_COLOR = (255, 0, 0)
@@ -56,14 +147,126 @@ MINIMAP_COLOR = (50, 50, 50)
 MAP_SIZE = 5000
 MAP_HALF = MAP_SIZE // 2
 PLANET_SAFE_DISTANCE = 500
+PLANET_COUNTS = {"red": 10, "blue": 60, "green": 30} # 종류별 행성 수 (배치 순서대로)
+
+# 무한 우주 모드: 우주를 CHUNK_SIZE 크기의 구역으로 나누고, 구역 좌표로 정한 시드로 우주선 근처 구역만 그때그때 만듭니다
+WORLD_MODES = ("box", "chunked")
+WORLD_MODE = "box"
+CHUNK_SIZE = 2500
+CHUNK_RADIUS = 1 # 우주선이 있는 구역에서 이만큼 떨어진 구역까지 불러 둡니다 (1이면 3 x 3)
+CHUNK_CACHE_SIZE = 49 # 메모리에 남겨 둘 최대 구역 수. 넘치면 가장 오래 들르지 않은 구역부터 버립니다
+CHUNK_PLANET_COUNTS = {"red": 3, "blue": 15, "green": 7} # 구역 하나의 종류별 행성 수 (기본 맵과 같은 밀도)
+CHUNK_FUEL_POD_COUNT = 5
 
 FUEL_CONSUMPTION = 10
 FUEL_POD_COUNT = 20
+FUEL_POD_COLOR = (100, 255, 100)
+FUEL_POD_RADIUS = 6
+FUEL_POD_COLLECT_DISTANCE = 20
 
 WARNING_DISTANCE = 120
 MINIMAP_SCALE = 0.05
+MINIMAP_REFRESH_RATE = 10 # 미니맵의 행성 위치를 초당 몇 번 다시 그릴지
+SPATIAL_CELL_SIZE = 250 # 공간 격자 한 칸의 크기 (화면 하나가 몇 칸에 걸치도록)
+
+# 중력 계산 방식: "exact"(모든 행성 합산), "cutoff"(반경 안은 정확히, 밖은 거친 격자의 질량중심), "barnes_hut"(쿼드트리 근사)
+GRAVITY_SOLVERS = ("exact", "cutoff", "barnes_hut")
+GRAVITY_SOLVER = "exact"
+# 이 반경 안의 행성은 하나씩 더하고, 밖은 (반경 / 2) 크기 격자 칸의 질량중심으로 더합니다.
+# 먼 행성을 그냥 버리면 평면에서는 합이 0에 가깝지 않아 상대 오차가 중앙값 30~40%, 최대 수백 %였습니다.
+# 질량중심으로 더하면 기본 맵·1만·5만 개 맵에서 중앙값 약 0.1%, 95% 지점 1% 미만, 최대 4~9%입니다 (gravity_error로 측정)
+GRAVITY_CUTOFF = 1500
+GRAVITY_CUTOFF_MAX_CELLS = 48 # 넓은 맵에서는 칸을 키워 먼 칸 합산 비용을 묶어 둡니다 (근처 5 x 5 칸은 그만큼 넓어집니다)
+BARNES_HUT_THETA = 0.5 # 셀 크기 / 거리가 이 값보다 작으면 셀 전체를 질량중심 하나로 봅니다
+BARNES_HUT_LEAF_CAPACITY = 8 # 잎 셀 하나에 평균적으로 들어갈 행성 수
+BARNES_HUT_REBUILD_TICKS = 15 # 트리(와 cutoff의 격자)를 다시 만드는 간격. 그 사이 행성 이동은 먼 셀의 질량중심 오차로만 나타납니다
+# 근사 방식이 exact보다 빨라지는 행성 수. 이보다 적으면 configure_gravity가 exact로 계산합니다.
+# 15틱마다 다시 만드는 비용을 나눠 넣은 한 틱 비용 (µs, exact / cutoff / barnes_hut):
+# 1천 개 29 / 67 / 147, 6천 개 96 / 99 / 177, 1만 개 146 / 110 / 221, 2만 개 296 / 130 / 237, 5만 개 728 / 205 / 346
+GRAVITY_APPROX_MIN_PLANETS = {"cutoff": 8000, "barnes_hut": 20000}
+
+# 물리 진행: 화면 프레임과 상관없이 PHYSICS_DT 간격으로 고정해서 진행합니다
+TARGET_FPS = 60 # 화면 갱신 목표. 느린 기기에서는 낮춰도 게임 진행은 같습니다
+PHYSICS_DT = 1 / 120
+MAX_FRAME_TIME = 0.25 # 프레임이 이보다 오래 걸리면 나머지 시간은 버립니다 (따라잡느라 더 느려지지 않도록)
+INTEGRATORS = ("semi_implicit_euler", "velocity_verlet")
+INTEGRATOR = "semi_implicit_euler"
+# 한 스텝에 우주선이 충돌 반경의 절반 이상 움직이거나 중력 가속도가 강하면 스텝을 더 잘게 나눕니다
+SUBSTEP_MAX_DISTANCE = (PLANET_RADIUS + SHIP_RADIUS) / 2
+SUBSTEP_ACCELERATION = 300
+MAX_SUBSTEPS = 16
+
+PROFILER_WINDOW = 600 # 백분위수를 계산할 최근 프레임 수
+PROFILER_OVERLAY_INTERVAL = 0.5 # 오버레이 글자를 다시 만드는 간격(초)
+
+HIGHSCORE_FILE = "highscore.txt" # 이전 버전의 최고 기록 파일. 프로필 저장소를 처음 만들 때 전체 최고 기록으로 옮겨 옵니다
+
+# 프로필 저장소: 사용자 데이터 폴더의 SQLite 파일 하나에 플레이어별 최고 기록·코인·업그레이드와 판 기록을 저장합니다
+APP_NAME = "GravityGame"
+PROFILE_DB_FILE = "profiles.db"
+PROFILE_FLUSH_INTERVAL = 1.0 # 쓰기를 이 시간(초) 동안 모았다가 트랜잭션 하나로 기록합니다
+
+# 리플레이: 판마다 시드·설정·틱별 키 입력을 저장해 두었다가 똑같이 다시 진행합니다
+REPLAY_MAGIC = b"GGR1"
+REPLAY_DIR = "replays" # 사용자 데이터 폴더(user_data_dir) 안의 폴더 이름
+REPLAY_KEEP = 20 # 최근 몇 판의 리플레이 파일을 남길지
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16, 64) # 재생 화면에서 ↑/↓로 고르는 배속
+REPLAY_SEEK_SECONDS = 10 # ←/→ 한 번에 이동하는 시간
+REPLAY_MAX_TICKS = int(3600 / PHYSICS_DT) # 검증할 리플레이 길이 상한 (1시간)
+# 맵 생성과 물리 진행에 쓰이는 설정. 리플레이에 같이 저장해 다른 설정으로 실행해도 똑같이 재현합니다
+REPLAY_PARAMS = ("WORLD_MODE", "MAP_SIZE", "PLANET_SAFE_DISTANCE", "PLANET_COUNTS", "FUEL_POD_COUNT",
+                 "CHUNK_SIZE", "CHUNK_RADIUS", "CHUNK_PLANET_COUNTS", "CHUNK_FUEL_POD_COUNT",
+                 "GRAVITY_SOLVER", "GRAVITY_CUTOFF", "BARNES_HUT_THETA", "INTEGRATOR", "PHYSICS_DT")
+
+# 점수 서버
+SCORE_SERVER_URL = "https://gravity-game-backend.onrender.com"
+SCORE_OUTBOX_FILE = "score_outbox.json" # 아직 서버에 보내지 못한 점수. 사용자 데이터 폴더에 둡니다
+SCORE_BATCH_SIZE = 20
+SCORE_RETRY_BASE, SCORE_RETRY_MAX = 2.0, 300.0 # 재시도 대기 시간(초): 실패할 때마다 두 배, 최대값까지
+SCORE_RETRY_STATUSES = (404, 405, 408, 429) # 다시 보내 볼 4xx 응답. 나머지 4xx는 서버가 점수를 거부한 것으로 보고 버립니다
+
+# --- 폰트 설정 ---
+# 폰트는 크기별로 한 번만 열고, 렌더링한 글자 Surface는 (문자열, 크기, 색상)별로 LRU 캐시에 보관합니다.
+TEXT_CACHE_SIZE = 256
+_fonts = {}
 
-HIGHSCORE_FILE = "highscore.txt"
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        try:
+            font = pygame.font.Font(font_path, size)
+        except (OSError, pygame.error) as e:
+            # 폰트 파일이 없으면 pygame 기본 폰트로 대신합니다 (한글은 보이지 않을 수 있음)
+            if not _fonts: print(f"폰트를 불러오지 못해 기본 폰트를 씁니다: {e}")
+            font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
+class TextCache:
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, text, size, color):
+        key = (text, size, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.surfaces[key] = get_font(size).render(text, True, color)
+        if len(self.surfaces) > self.maxsize: self.surfaces.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+
+text_cache = TextCache()
+
+def render_text(text, size, color=WHITE):
+    return text_cache.render(text, size, color)
 
 # 업그레이드 효과 및 제한
 upgrade_effects = {
@@ -85,6 +288,7 @@ upgrade_data = {
     "thrust": 100,
     "points": 0
 }
+UPGRADE_DEFAULTS = dict(upgrade_data) # 새 프로필의 시작 값
 
 # 고정 가격 (추진력 제외, 추진력은 동적 계산)
 upgrade_prices = {
@@ -110,29 +314,26 @@ def get_thrust_price():
     return base_price + current_level * 10
 
 class Spaceship:
-    def __init__(self, x, y):
+    def __init__(self, x, y, upgrades=None):
+        self.upgrades = upgrade_data if upgrades is None else upgrades
         self.pos = pygame.Vector2(x, y)
         self.vel = pygame.Vector2(0, 0)
         self.acc = pygame.Vector2(0, 0)
         self.time_alive = 0
-        self.fuel = upgrade_data["max_fuel"]
+        self.fuel = self.upgrades["max_fuel"]
+        self.fuel_used = 0
+        self.pods_collected = 0
+        self.bounded = True # 무한 우주 모드에서는 False: 맵 경계에 막히지 않습니다
         self.alive = True
         self.distance_traveled = 0
         self.prev_pos = pygame.Vector2(x, y)
 
     def apply_gravity(self, planets):
-        total_force = pygame.Vector2(0, 0)
-        for planet in planets:
-            dir_vector = planet.pos - self.pos
-            distance_sq = max(dir_vector.length_squared(), 100)
-            force_magnitude = planet.gravity_strength * planet.mass / distance_sq
-            force = dir_vector.normalize() * force_magnitude
-            total_force += force
-        self.acc = total_force
+        self.acc = pygame.Vector2(planets.acceleration(self.pos))
 
     def apply_input(self, keys, dt):
         thrust = pygame.Vector2(0, 0)
-        thrust_val = upgrade_data["thrust"]
+        thrust_val = self.upgrades["thrust"]
 
         if self.fuel > 0:
             if keys[pygame.K_LEFT]:
@@ -145,160 +346,1451 @@ class Spaceship:
                 thrust.y += thrust_val
 
             if thrust.length_squared() > 0:
-                self.fuel -= FUEL_CONSUMPTION * dt
-                self.fuel = max(self.fuel, 0)
+                burned = min(FUEL_CONSUMPTION * dt, self.fuel)
+                self.fuel -= burned
+                self.fuel_used += burned
 
         self.acc += thrust
 
-    def update(self, planets, dt, keys):
+    def update(self, planets, dt, keys, integrator=INTEGRATOR):
         if not self.alive:
             return
         self.apply_gravity(planets)
+        gravity = pygame.Vector2(self.acc)
         self.apply_input(keys, dt)
-        self.vel += self.acc * dt
-        self.pos += self.vel * dt
+        if integrator == "semi_implicit_euler":
+            self.vel += self.acc * dt
+            self.pos += self.vel * dt
+        elif integrator == "velocity_verlet":
+            # 새 위치의 중력으로 가속도를 다시 구해 이전 가속도와 평균을 냅니다 (추진력은 스텝 동안 일정)
+            self.pos += self.vel * dt + self.acc * (0.5 * dt * dt)
+            new_acc = pygame.Vector2(planets.acceleration(self.pos)) + (self.acc - gravity)
+            self.vel += (self.acc + new_acc) * (0.5 * dt)
+            self.acc = new_acc
+        else:
+            raise ValueError(f"unknown integrator: {integrator}")
         self.time_alive += dt
-        self.distance_traveled += (self.pos - self.prev_pos).length()
+        self.distance_traveled += math.hypot(self.pos.x - self.prev_pos.x, self.pos.y - self.prev_pos.y)
         self.prev_pos = self.pos.copy()
 
+        if not self.bounded: return
         if self.pos.x < -MAP_HALF: self.pos.x, self.vel.x = -MAP_HALF, 0
         elif self.pos.x > MAP_HALF: self.pos.x, self.vel.x = MAP_HALF, 0
         if self.pos.y < -MAP_HALF: self.pos.y, self.vel.y = -MAP_HALF, 0
         elif self.pos.y > MAP_HALF: self.pos.y, self.vel.y = MAP_HALF, 0
 
-    def draw(self, surface, camera_offset):
-        draw_pos = self.pos - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
-        if self.alive:
-            pygame.draw.circle(surface, SHIP_COLOR, draw_pos, SHIP_RADIUS)
-        else:
-            pygame.draw.circle(surface, EXPLOSION_COLOR, draw_pos, SHIP_RADIUS * 2)
+    def sprite(self):
+        return circle_sprite(SHIP_COLOR, SHIP_RADIUS) if self.alive else circle_sprite(EXPLOSION_COLOR, SHIP_RADIUS * 2)
 
     def check_collision(self, planets):
-        for planet in planets:
-            if (self.pos - planet.pos).length() < (PLANET_RADIUS + SHIP_RADIUS):
-                self.alive = False
-                return True
+        if planets.proximity(self.pos).collided:
+            self.alive = False
+            return True
         return False
 
-class Planet:
-    def __init__(self, x, y, planet_type):
-        self.pos = pygame.Vector2(x, y)
-        self.vel = pygame.Vector2(random.uniform(-20, 20), random.uniform(-20, 20))
-        self.type = planet_type
-        if planet_type == "red":
-            self.mass, self.color, self.gravity_strength = 5000, RED_COLOR, 1500
-        elif planet_type == "blue":
-            self.mass, self.color, self.gravity_strength = 3000, BLUE_COLOR, 500
-        elif planet_type == "green":
-            self.mass, self.color, self.gravity_strength = 4000, GREEN_COLOR, 1000
+def view_rect(camera_offset, margin=0):
+    """ 카메라가 보고 있는 화면 영역을 월드 좌표 (left, top, right, bottom)로 돌려줍니다. """
+    return (camera_offset[0] - WIDTH / 2 - margin, camera_offset[1] - HEIGHT / 2 - margin,
+            camera_offset[0] + WIDTH / 2 + margin, camera_offset[1] + HEIGHT / 2 + margin)
+
+# 물리 계산의 합은 모두 순서가 정해진 NumPy 연산으로 합니다. BLAS(@)나 einsum은 빌드와 CPU에 따라 더하는 순서나
+# FMA 사용이 달라 마지막 비트가 달라지고, 궤도가 혼돈적이라 그 차이가 다른 점수로 커져 리플레이 검증이 실패합니다.
+def _norm_sq(v):
+    """ N x 2 배열의 행마다 x² + y². """
+    return v[:, 0] * v[:, 0] + v[:, 1] * v[:, 1]
+
+def _weighted_sum(coef, v):
+    """ coef(N)로 가중한 v(N x 2) 행들의 합 (x, y). 열마다 NumPy의 정해진 순서(쌍별 합)로 더합니다. """
+    return (coef * v[:, 0]).sum(), (coef * v[:, 1]).sum()
+
+def _concat_ranges(starts, ends):
+    """ [starts[i], ends[i]) 구간들을 이어 붙인 번호 배열. """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total: return np.empty(0, dtype=np.intp)
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+def _column_bounds(v):
+    """ N x 2 배열의 열별 최솟값, 최댓값. min(axis=0)은 행마다 건너뛰며 읽어 열을 따로 구하는 것보다 열 배 넘게 느립니다. """
+    return np.array([v[:, 0].min(), v[:, 1].min()]), np.array([v[:, 0].max(), v[:, 1].max()])
+
+def _argsort_codes(code, count):
+    """ 0 이상 count 미만인 칸 번호의 안정 정렬 순서. 16비트에 들어가면 NumPy가 기수 정렬을 써서 열 배 가까이 빠릅니다. """
+    return np.argsort(code.astype(np.int16) if count <= 1 << 15 else code, kind="stable")
+
+class SpatialHash:
+    """ 맵을 균일한 칸으로 나눈 공간 인덱스. 항목 번호를 칸 번호 순으로 정렬한 배열(order)과
+    칸마다의 시작 위치(cell_starts)만 들고 있어서 항목 하나에 십여 바이트면 됩니다.
+    points 배열(N x 2)을 참조로 들고 있어서, 위치가 바뀐 뒤 update()를 부르면 항목이 원래 칸에서
+    얼마나 벗어났는지 봅니다. 한 칸까지는 조회 범위를 그만큼(slack) 넓혀 찾고, 두 칸 이상 벗어난
+    항목이 생길 때만 다시 정렬합니다. 조회 결과는 실제 위치로 다시 거르므로 정확합니다. """
+    def __init__(self, points, cell_size=SPATIAL_CELL_SIZE, active=None):
+        self.points, self.cell_size = points, cell_size
+        self.active = np.ones(len(points), dtype=bool) if active is None else np.array(active, dtype=bool)
+        self.rebuilds = 0
+        self._build()
+
+    def _keys(self):
+        return np.floor(self.points / self.cell_size).astype(np.int64)
+
+    @staticmethod
+    def _encode(cx, cy):
+        # (cx, cy) 사전순과 같은 순서가 되는 int64 칸 번호
+        return (cx << 32) + (cy + 2 ** 31)
+
+    def _build(self):
+        keys = self._keys()
+        self.keys = keys.astype(np.int32)
+        alive = np.flatnonzero(self.active)
+        codes = self._encode(keys[alive, 0], keys[alive, 1])
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.intp)
+        self.order = alive[order].astype(np.int32)
+        self.cell_codes = codes[starts]
+        self.cell_starts = np.r_[starts, len(codes)].astype(np.int32)
+        self.slack = 0
+        self.rebuilds += 1
+
+    def update(self):
+        if not len(self.points): return
+        drift = np.abs(self._keys() - self.keys)[self.active].max(initial=0)
+        if drift > 1: self._build()
+        else: self.slack = max(self.slack, int(drift))
+
+    def remove(self, index):
+        """ 항목(번호 또는 번호 배열)을 조회 대상에서 뺍니다. 자리는 다음에 다시 정렬할 때 정리됩니다. """
+        self.active[index] = False
+
+    def query_rect(self, left, top, right, bottom):
+        """ 사각형 안에 있는 항목 번호 배열. """
+        size, slack = self.cell_size, self.slack
+        x0, y0 = int(left // size) - slack, int(top // size) - slack
+        x1, y1 = int(right // size) + slack, int(bottom // size) + slack
+        codes = self.cell_codes
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(codes):
+            cx, cy = codes >> 32, (codes & 0xFFFFFFFF) - 2 ** 31
+            cells = np.flatnonzero((cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1))
+        else:
+            wanted = self._encode(np.arange(x0, x1 + 1, dtype=np.int64)[:, None], np.arange(y0, y1 + 1, dtype=np.int64)).ravel()
+            cells = np.searchsorted(codes, wanted)
+            cells = cells[codes[np.minimum(cells, len(codes) - 1)] == wanted] if len(codes) else cells[:0]
+        ids = self.order[_concat_ranges(self.cell_starts[cells], self.cell_starts[cells + 1])].astype(np.intp)
+        ids = ids[self.active[ids]]
+        p = self.points[ids]
+        return ids[(p[:, 0] >= left) & (p[:, 0] <= right) & (p[:, 1] >= top) & (p[:, 1] <= bottom)]
+
+    def query_radius(self, center, radius):
+        """ center에서 radius 미만 거리에 있는 항목 번호 배열. """
+        x, y = center[0], center[1]
+        ids = self.query_rect(x - radius, y - radius, x + radius, y + radius)
+        offset = self.points[ids] - (x, y)
+        return ids[_norm_sq(offset) < radius * radius]
+
+# 우주선 근처 행성 판정: 충돌 여부, 경고 대상 행성 인덱스
+PlanetProximity = namedtuple("PlanetProximity", "collided warnings")
+# 근사 중력과 정확한 합의 비교: 두 가속도와 상대 오차 |approx - exact| / |exact|
+GravityError = namedtuple("GravityError", "approx exact relative")
+
+class PlanetSystem:
+    """ 모든 행성의 위치·속도·종류를 연속된 NumPy 배열로 보관합니다. 질량과 중력 세기는 종류 번호로 표에서 찾습니다.
+    중력(acceleration)과 충돌·경고 범위(proximity)를 우주선 위치마다 한 번의 배치 계산으로 구하고,
+    행성이 움직이기 전까지는 그 결과를 재사용합니다. 충돌·경고는 중력과 따로 캐시하므로 충돌 판정이
+    중력을 다시 계산하지 않습니다. 충돌·경고·화면 판정은 공간 격자(grid)로 근처 행성만 살펴봅니다. """
+    def __init__(self, pos, vel, type_id, bounds=None):
+        # 위치는 무한 우주 모드의 먼 좌표에서도 정밀도가 남도록 float64, 속도(±20)와 중력 계수는 float32로 충분합니다
+        self.pos, self.vel, self.type_id, self.bounds = pos, vel.astype(np.float32), type_id, bounds
+        self.gm = (PLANET_MASSES * PLANET_GRAVITY_STRENGTHS).astype(np.float32)[type_id]
+        self.grid = SpatialHash(self.pos)
+        self.requested_solver, self.cutoff, self.theta = GRAVITY_SOLVER, GRAVITY_CUTOFF, BARNES_HUT_THETA
+        self.version = 0
+        self._acc_key, self._acc = None, None
+        self._proximity_key, self._proximity = None, None
+        self.configure_gravity()
+
+    @property
+    def mass(self):
+        return PLANET_MASSES[self.type_id]
+
+    @property
+    def gravity_strength(self):
+        return PLANET_GRAVITY_STRENGTHS[self.type_id]
+
+    @classmethod
+    def from_arrays(cls, pos, vel, type_id, bounds=None):
+        """ 위치·속도(N x 2)와 종류 번호(N) 배열로 만듭니다. 모양과 자료형은 여기서 맞춥니다.
+        bounds는 행성마다 움직일 수 있는 영역 (lo, hi) 배열 쌍(N x 2)이며, 없으면 맵 전체입니다. """
+        return cls(np.asarray(pos, dtype=float).reshape(-1, 2), np.asarray(vel).reshape(-1, 2), np.asarray(type_id, dtype=np.uint8), bounds)
+
+    def __len__(self):
+        return len(self.pos)
 
     def update(self, dt):
+        lo, hi = self.bounds if self.bounds is not None else (-MAP_HALF, MAP_HALF)
         self.pos += self.vel * dt
-        if self.pos.x < -MAP_HALF or self.pos.x > MAP_HALF:
-            self.vel.x *= -1
-            self.pos.x = max(min(self.pos.x, MAP_HALF), -MAP_HALF)
-        if self.pos.y < -MAP_HALF or self.pos.y > MAP_HALF:
-            self.vel.y *= -1
-            self.pos.y = max(min(self.pos.y, MAP_HALF), -MAP_HALF)
-
-    def draw(self, surface, camera_offset):
-        draw_pos = self.pos - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
-        pygame.draw.circle(surface, self.color, draw_pos, PLANET_RADIUS)
-
-class FuelPod:
-    def __init__(self, x, y):
-        self.pos = pygame.Vector2(x, y)
-        self.collected = False
-
-    def draw(self, surface, camera_offset):
-        if not self.collected:
-            draw_pos = self.pos - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
-            pygame.draw.circle(surface, (100, 255, 100), draw_pos, 6)
-
-    def check_collect(self, ship):
-        if not self.collected and (ship.pos - self.pos).length() < 20:
-            self.collected = True
-            ship.fuel = min(upgrade_data["max_fuel"], ship.fuel + upgrade_data["fuel_pod_recharge"])
-
-def generate_planets():
-    planets = []
-    def place_planets(count, planet_type):
-        for _ in range(count * 10): # Limit tries
-            x, y = random.randint(-MAP_HALF, MAP_HALF), random.randint(-MAP_HALF, MAP_HALF)
-            pos = pygame.Vector2(x, y)
-            if pos.length() < PLANET_SAFE_DISTANCE: continue
-            if not any((p.pos - pos).length() < (PLANET_RADIUS * 2 + 80) for p in planets):
-                planets.append(Planet(x, y, planet_type))
-                if len([p for p in planets if p.type == planet_type]) >= count: return
-    place_planets(10, "red")
-    place_planets(60, "blue")
-    place_planets(30, "green")
-    return planets
-
-def generate_fuelpods(num_pods):
-    return [FuelPod(random.randint(-MAP_HALF, MAP_HALF), random.randint(-MAP_HALF, MAP_HALF)) for _ in range(num_pods)]
+        out = (self.pos < lo) | (self.pos > hi)
+        self.vel[out] *= -1
+        np.clip(self.pos, lo, hi, out=self.pos)
+        self.moved()
+
+    def moved(self):
+        """ 위치 배열이 바뀐 뒤 격자와 중력·근처 판정 캐시를 맞춥니다. """
+        self.grid.update()
+        self.version += 1
+
+    def query_radius(self, pos, radius):
+        return self.grid.query_radius(pos, radius)
+
+    def visible_ids(self, camera_offset):
+        """ 화면에 걸치는 행성 번호 배열. """
+        return self.grid.query_rect(*view_rect(camera_offset, PLANET_RADIUS))
+
+    def configure_gravity(self, solver=None, cutoff=None, theta=None):
+        """ 중력 계산 방식을 바꿉니다. 지정하지 않은 값은 그대로 둡니다. 행성 수가 그 방식의
+        GRAVITY_APPROX_MIN_PLANETS보다 적으면 실제 계산(self.solver)은 exact로 합니다. """
+        if solver is not None and solver not in GRAVITY_SOLVERS: raise ValueError(f"unknown gravity solver: {solver}")
+        self.requested_solver = solver or self.requested_solver
+        self.solver = self.requested_solver if len(self) >= GRAVITY_APPROX_MIN_PLANETS.get(self.requested_solver, 0) else "exact"
+        self.cutoff = self.cutoff if cutoff is None else cutoff
+        self.theta = self.theta if theta is None else theta
+        self.version += 1
+        self._tree = self._far_grid = None
+
+    def acceleration(self, pos):
+        """ pos에서의 중력 가속도 (ax, ay). 행성이 움직이기 전까지 같은 위치는 다시 계산하지 않습니다. """
+        key = (self.version, pos[0], pos[1])
+        if key != self._acc_key: self._acc_key, self._acc = key, self.gravity_at(pos)
+        return self._acc
+
+    def proximity(self, pos):
+        """ pos에 있는 우주선의 충돌 여부와 경고 범위 안의 행성 (PlanetProximity). 격자 조회만 합니다. """
+        key = (self.version, pos[0], pos[1])
+        if key == self._proximity_key: return self._proximity
+        warnings = self.grid.query_radius(pos, WARNING_DISTANCE + PLANET_RADIUS)
+        offset = self.pos[warnings] - (pos[0], pos[1])
+        collided = bool(np.any(_norm_sq(offset) < (PLANET_RADIUS + SHIP_RADIUS) ** 2))
+        self._proximity_key, self._proximity = key, PlanetProximity(collided, warnings)
+        return self._proximity
+
+    def gravity_at(self, pos, solver=None):
+        """ pos에서의 중력 가속도 (ax, ay). solver를 주지 않으면 self.solver를 씁니다. """
+        solver = solver or self.solver
+        if solver == "exact": return self._gravity_direct(pos)
+        if solver == "cutoff": return self._gravity_cutoff(pos)
+        if solver == "barnes_hut": return self._gravity_barnes_hut(pos)
+        raise ValueError(f"unknown gravity solver: {solver}")
+
+    def gravity_error(self, pos):
+        """ 현재 solver의 결과를 정확한 합과 비교합니다. """
+        approx, exact = self.gravity_at(pos), self.gravity_at(pos, "exact")
+        exact_norm = np.hypot(*exact)
+        error = np.hypot(approx[0] - exact[0], approx[1] - exact[1])
+        return GravityError(approx, exact, float(error / exact_norm) if exact_norm > 0 else float(error))
+
+    def _gravity_direct(self, pos, ids=None):
+        points, gm = (self.pos, self.gm) if ids is None else (self.pos[ids], self.gm[ids])
+        offset = points - (pos[0], pos[1])
+        distance_sq = _norm_sq(offset)
+        distance = np.sqrt(distance_sq)
+        # 힘의 크기 = gm / max(r², 100), 방향 = offset / r  (r = 0 이면 힘 없음)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coef = np.where(distance > 0, gm / (np.maximum(distance_sq, 100) * distance), 0.0)
+        acc = _weighted_sum(coef, offset)
+        return float(acc[0]), float(acc[1])
+
+    def _build_far_grid(self):
+        """ 행성을 격자 칸으로 나누고, 칸별 행성 번호(정렬)와 비어 있지 않은 칸의 (gm 합, 질량중심)을 만듭니다.
+        칸 크기는 cutoff / 2이고, 맵이 넓으면 한 변이 GRAVITY_CUTOFF_MAX_CELLS 칸을 넘지 않도록 키웁니다. """
+        lo, hi = _column_bounds(self.pos)
+        size = max(self.cutoff / 2, float((hi - lo).max()) / GRAVITY_CUTOFF_MAX_CELLS, 1.0)
+        origin = np.floor(lo / size)
+        cx, cy = ((np.floor(self.pos[:, k] / size) - origin[k]).astype(np.int64) for k in (0, 1))
+        width = int(cy.max()) + 1
+        count = (int(cx.max()) + 1) * width
+        code = cx * width + cy
+        order = _argsort_codes(code, count)
+        counts = np.bincount(code, minlength=count)
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)))[np.append(occupied, count)]
+        m = np.bincount(code, self.gm, count)[occupied]
+        com = np.stack([np.bincount(code, self.gm * self.pos[:, k], count)[occupied] for k in (0, 1)], axis=1) / m[:, None]
+        self._far_grid = (self.version, size, origin, width, occupied, order, starts, m, com)
+
+    def _gravity_cutoff(self, pos):
+        """ 우주선 칸을 가운데로 한 5 x 5 칸(반경 cutoff 이상)의 행성은 정확히 더하고, 나머지 칸은 질량중심 하나로 더합니다.
+        먼 칸은 모든 칸을 한 번에 계산하면서 근처 칸의 계수만 0으로 둡니다. 각 행성은 한쪽에만 들어가므로 두 번 세지 않습니다. """
+        if len(self) == 0: return 0.0, 0.0
+        if self._far_grid is None or self.version - self._far_grid[0] >= BARNES_HUT_REBUILD_TICKS or len(self._far_grid[5]) != len(self):
+            self._build_far_grid()
+        _, size, origin, width, occupied, order, starts, m, com = self._far_grid
+        cx, cy = (np.floor(np.array(pos[:2]) / size) - origin).astype(np.int64)
+        j = np.arange(max(cy - 2, 0), min(cy + 3, width))
+        codes = (np.arange(cx - 2, cx + 3)[:, None] * width + j).ravel()
+        k = np.minimum(np.searchsorted(occupied, codes), len(occupied) - 1)
+        near = k[occupied[k] == codes]
+        ax, ay = self._gravity_direct(pos, order[_concat_ranges(starts[near], starts[near + 1])])
+        offset = com - (pos[0], pos[1])
+        distance_sq = _norm_sq(offset)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coef = np.where(distance_sq > 0, m / (np.maximum(distance_sq, 100) * np.sqrt(distance_sq)), 0.0)
+        coef[near] = 0.0
+        acc = _weighted_sum(coef, offset)
+        return ax + float(acc[0]), ay + float(acc[1])
+
+    def _build_tree(self):
+        """ 행성 전체를 감싸는 정사각형을 2^depth x 2^depth 잎 셀로 나누고, 잎에서 위로
+        2x2씩 합쳐 가며 단계별 (gm 합, gm 가중 x 합, gm 가중 y 합)을 만들고, 질의에서 나누지 않도록
+        단계마다 펼친 (gm 합, 질량중심 x, 질량중심 y)로 바꿔 둡니다. """
+        lo, hi = _column_bounds(self.pos)
+        extent = max(float((hi - lo).max()), 1.0) * (1 + 1e-9)
+        depth = max(0, int(np.ceil(np.log2(np.sqrt(len(self) / BARNES_HUT_LEAF_CAPACITY)))))
+        n = 1 << depth
+        cx, cy = (np.minimum(((self.pos[:, k] - lo[k]) * (n / extent)).astype(np.int64), n - 1) for k in (0, 1))
+        leaf = cx * n + cy
+        order = _argsort_codes(leaf, n * n)
+        starts = np.concatenate(([0], np.cumsum(np.bincount(leaf, minlength=n * n))))
+        level = tuple(np.bincount(leaf, weights, n * n).reshape(n, n) for weights in (self.gm, self.gm * self.pos[:, 0], self.gm * self.pos[:, 1]))
+        levels = [level]
+        while n > 1:
+            n //= 2
+            level = tuple(a[0::2, 0::2] + a[0::2, 1::2] + a[1::2, 0::2] + a[1::2, 1::2] for a in level)
+            levels.append(level)
+        levels.reverse()
+        levels = [(m.ravel(), *(np.divide(a, m, out=np.zeros_like(a), where=m > 0).ravel() for a in (mx, my))) for m, mx, my in levels]
+        self._tree = (self.version, extent, depth, levels, order, starts)
+
+    def _gravity_barnes_hut(self, pos):
+        """ 루트에서 한 단계씩 내려가며, 충분히 멀리 있는 셀은 질량중심으로 합산하고
+        가까운 셀만 자식 4개로 엽니다. 한 단계의 셀들은 배열로 한꺼번에 처리합니다. """
+        if len(self) == 0: return 0.0, 0.0
+        if self._tree is None or self.version - self._tree[0] >= BARNES_HUT_REBUILD_TICKS or len(self._tree[4]) != len(self):
+            self._build_tree()
+        _, extent, depth, levels, order, starts = self._tree
+        x, y = pos[0], pos[1]
+        ax = ay = 0.0
+        cells = np.zeros(1, dtype=np.int64) # 현재 단계에서 열어 볼 셀 번호 (i * 한 변의 셀 수 + j)
+        for level, (m, comx, comy) in enumerate(levels):
+            n = 1 << level
+            gm = m[cells]
+            cells, gm = cells[gm > 0], gm[gm > 0]
+            dx, dy = comx[cells] - x, comy[cells] - y
+            distance_sq = dx * dx + dy * dy
+            size = extent / n
+            far = size * size < self.theta ** 2 * distance_sq
+            if far.any():
+                coef = gm[far] / (np.maximum(distance_sq[far], 100) * np.sqrt(distance_sq[far]))
+                ax, ay = ax + float((coef * dx[far]).sum()), ay + float((coef * dy[far]).sum())
+            cells = cells[~far]
+            if level == depth or not len(cells): break
+            i, j = cells // n, cells % n
+            cells = ((2 * i[:, None] + (0, 0, 1, 1)) * (2 * n) + 2 * j[:, None] + (0, 1, 0, 1)).ravel()
+        if level == depth and len(cells):
+            nx, ny = self._gravity_direct(pos, order[_concat_ranges(starts[cells], starts[cells + 1])])
+            ax, ay = ax + nx, ay + ny
+        return ax, ay
+
+class FuelPodSystem:
+    """ 연료 탱크 위치와 수집 여부를 NumPy 배열로 보관하고 수집 판정을 한 번에 처리합니다.
+    수집한 탱크는 공간 격자에서 바로 빠지므로 이후 화면·수집 판정에서 다시 살펴보지 않습니다. """
+    def __init__(self, pos, collected):
+        self.pos, self.collected = pos, collected
+        self.remaining = len(pos) - int(np.count_nonzero(collected)) # 남은 탱크 수
+        self.grid = SpatialHash(self.pos, active=~collected)
+
+    @classmethod
+    def from_arrays(cls, pos, collected):
+        return cls(np.asarray(pos, dtype=float).reshape(-1, 2), np.asarray(collected, dtype=bool))
+
+    def __len__(self):
+        return len(self.pos)
+
+    def visible_ids(self, camera_offset):
+        """ 화면에 걸치는, 아직 수집되지 않은 탱크 번호 배열. """
+        ids = self.grid.query_rect(*view_rect(camera_offset, FUEL_POD_RADIUS))
+        return ids[~self.collected[ids]]
+
+    def collect(self, ship):
+        """ 우주선 근처의 수집되지 않은 탱크를 모두 수집하고 수집한 개수를 돌려줍니다. """
+        near = self.grid.query_radius(ship.pos, FUEL_POD_COLLECT_DISTANCE)
+        hits = near[~self.collected[near]]
+        if len(hits):
+            self.collected[hits] = True
+            self.grid.remove(hits)
+            self.remaining -= len(hits)
+            ship.pods_collected += len(hits)
+            ship.fuel = min(ship.upgrades["max_fuel"], ship.fuel + ship.upgrades["fuel_pod_recharge"] * len(hits))
+        return len(hits)
+
+def place_points(rng, count, min_distance, half, safe_distance=0, batch=None, center=(0.0, 0.0)):
+    """ center를 중심으로 한 변이 2 * half인 정사각형 안에 서로 min_distance 이상, 원점에서 safe_distance 이상
+    떨어진 점 count개를 뽑습니다 (N x 2 배열, 뽑힌 순서). 한 변이 min_distance / √2인 격자 칸에는 점이 많아야
+    하나라서 후보마다 주변 5 x 5 칸만 보면 되고, 후보를 묶음으로 한꺼번에 검사합니다.
+    무작위로 던지는 방식은 육각형 최밀 배치의 절반 남짓에서 더 들어가지 않으므로, 20묶음 연속으로 하나도 못 놓으면
+    처음부터 흔든 육각 격자(_lattice_points)로 다시 놓습니다. rng는 numpy Generator.
+    자리가 모자라 다 놓을 수 없으면 ValueError. """
+    if count == 0: return np.empty((0, 2))
+    cell = min_distance / math.sqrt(2)
+    side = int(math.ceil(2 * half / cell)) + 1
+    corner = np.array(center, dtype=float) - half
+    # 원형 디스크 최밀 배치(육각형)로도 못 들어가는 개수는 바로 거절
+    free_area = (2 * half + min_distance) ** 2
+    if not any(center): free_area -= math.pi * max(safe_distance - min_distance / 2, 0) ** 2
+    if count * (math.sqrt(3) / 2) * min_distance ** 2 > free_area:
+        raise ValueError(f"cannot place {count} points {min_distance} apart in a {2 * half} map")
+    grid = np.full((side + 4, side + 4), -1, dtype=np.int64) # 가장자리 2칸 여백: 이웃 칸 인덱스가 넘치지 않게
+    points = np.empty((count, 2))
+    placed, stalled = 0, 0
+    offsets = np.array([(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if (dx, dy) != (0, 0)])
+    min_sq = min_distance * min_distance
+    while placed < count:
+        size = batch or max(256, 2 * (count - placed))
+        cand = rng.uniform(0, 2 * half, (size, 2)) + corner
+        cand = cand[_norm_sq(cand) >= safe_distance * safe_distance]
+        keys = np.floor((cand - corner) / cell).astype(np.int64) + 2
+        # 같은 칸에 떨어진 후보는 먼저 뽑힌 하나만 남김
+        _, first = np.unique(keys[:, 0] * (side + 4) + keys[:, 1], return_index=True)
+        first.sort()
+        cand, keys = cand[first], keys[first]
+        ok = grid[keys[:, 0], keys[:, 1]] < 0
+        # 이미 놓인 점과의 거리
+        for dx, dy in offsets:
+            neighbor = grid[keys[:, 0] + dx, keys[:, 1] + dy]
+            near = ok & (neighbor >= 0)
+            d = points[neighbor[near]] - cand[near]
+            ok[np.flatnonzero(near)[_norm_sq(d) < min_sq]] = False
+        cand, keys = cand[ok], keys[ok]
+        # 같은 묶음 안에서 먼저 뽑힌 후보와의 거리: 후보 번호로 임시 격자를 채워 비교
+        grid[keys[:, 0], keys[:, 1]] = -2 - np.arange(len(cand))
+        ok = np.ones(len(cand), dtype=bool)
+        for dx, dy in offsets:
+            other = -2 - grid[keys[:, 0] + dx, keys[:, 1] + dy]
+            near = (other >= 0) & (other < np.arange(len(cand)))
+            d = cand[other[near]] - cand[near]
+            ok[np.flatnonzero(near)[_norm_sq(d) < min_sq]] = False
+        grid[keys[:, 0], keys[:, 1]] = -1
+        take = np.flatnonzero(ok)[:count - placed]
+        points[placed:placed + len(take)] = cand[take]
+        grid[keys[take, 0], keys[take, 1]] = np.arange(placed, placed + len(take))
+        placed += len(take)
+        stalled = 0 if len(take) else stalled + 1
+        if stalled >= 20: return _lattice_points(rng, count, min_distance, half, safe_distance, corner)
+    return points
+
+def _lattice_points(rng, count, min_distance, half, safe_distance, corner):
+    """ place_points가 막혔을 때 쓰는 배치. 간격 s인 육각 격자 점 중 count개를 무작위로 고르고, 각 점을
+    (s - min_distance) / 2 안에서 흔듭니다. 그러면 서로 min_distance 이상 떨어져 있으므로, s는 점이 count개
+    이상 나오는 가장 큰 간격으로 고릅니다 (이분 탐색). 흔들어도 맵과 안전 거리를 넘지 않도록 그만큼 안쪽 점만 씁니다. """
+    shift = rng.uniform(0, 1, 2)
+
+    def lattice(s):
+        jitter = (s - min_distance) / 2
+        lo, hi = corner + jitter, corner + 2 * half - jitter
+        row = s * math.sqrt(3) / 2
+        ys = np.arange(lo[1] + shift[1] * row, hi[1], row)
+        xs = np.arange(lo[0] + shift[0] * s - s, hi[0], s)
+        pts = np.stack(np.broadcast_arrays(xs[None, :] + (np.arange(len(ys)) % 2)[:, None] * s / 2, ys[:, None]), axis=-1).reshape(-1, 2)
+        pts = pts[np.all((pts >= lo) & (pts <= hi), axis=1)]
+        return pts[_norm_sq(pts) >= (safe_distance + jitter) ** 2], jitter
+
+    if len(lattice(min_distance)[0]) < count:
+        raise ValueError(f"cannot place {count} points {min_distance} apart in a {2 * half} map")
+    low, high = min_distance, 4 * half + min_distance
+    for _ in range(40):
+        mid = (low + high) / 2
+        if len(lattice(mid)[0]) >= count: low = mid
+        else: high = mid
+    pts, jitter = lattice(low)
+    pts = pts[rng.permutation(len(pts))[:count]]
+    angle, radius = rng.uniform(0, 2 * math.pi, count), jitter * np.sqrt(rng.uniform(0, 1, count))
+    return pts + np.stack((np.cos(angle), np.sin(angle)), axis=1) * radius[:, None]
+
+def generate_planets(rng=random):
+    """ PLANET_COUNTS만큼 행성을 서로 PLANET_RADIUS * 2 + 80 이상, 시작 지점에서 PLANET_SAFE_DISTANCE 이상
+    떨어뜨려 놓습니다. rng에서 시드를 하나 뽑아 쓰므로 같은 rng 상태면 같은 맵이 나옵니다.
+    종류는 PLANET_COUNTS 순서대로 배치 순서에 따라 정해집니다. """
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    total = sum(PLANET_COUNTS.values())
+    pos = place_points(np_rng, total, PLANET_RADIUS * 2 + 80, MAP_HALF, PLANET_SAFE_DISTANCE)
+    vel = np_rng.uniform(-20, 20, (total, 2))
+    type_id = np.repeat([PLANET_TYPE_NAMES.index(name) for name in PLANET_COUNTS], list(PLANET_COUNTS.values()))
+    return PlanetSystem.from_arrays(pos, vel, type_id)
+
+def generate_fuelpods(num_pods, rng=random):
+    """ 맵 안의 정수 좌표에 연료 탱크 num_pods개를 놓습니다. generate_planets처럼 rng에서 시드를 하나 뽑아 씁니다. """
+    pos = np.random.default_rng(rng.getrandbits(64)).integers(-MAP_HALF, MAP_HALF, (num_pods, 2), endpoint=True)
+    return FuelPodSystem.from_arrays(pos, np.zeros(num_pods, dtype=bool))
+
+# 무한 우주의 구역 하나. 배열은 구역이 메모리에 남아 있는 동안 행성 이동을 그대로 간직하고, 수집한 탱크는 빼 둡니다.
+Chunk = namedtuple("Chunk", "key pos vel type_id pod_pos")
+
+class ChunkedUniverse:
+    """ 끝이 없는 우주. 우주선이 있는 구역과 그 주변 CHUNK_RADIUS 안의 구역만 하나의 PlanetSystem·FuelPodSystem으로
+    묶어 두고, 우주선이 다른 구역으로 넘어갈 때만 다시 묶습니다. 구역은 (시드, 구역 좌표)로 만든 난수로 처음 들를 때
+    생성하므로, LRU로 버린 구역에 다시 오면 처음 상태 그대로 다시 만들어집니다. 행성은 자기 구역 안에서만 움직입니다.
+    한 번에 다루는 행성·탱크 수가 일정하므로 얼마나 멀리 날아가도 메모리와 프레임당 비용이 늘지 않습니다. """
+    def __init__(self, seed, chunk_size=None, radius=None, cache_size=CHUNK_CACHE_SIZE, gravity_solver=None):
+        self.seed, self.chunk_size = seed, chunk_size or CHUNK_SIZE
+        self.radius = CHUNK_RADIUS if radius is None else radius
+        self.cache_size = max(cache_size, (2 * self.radius + 1) ** 2) # 불러 둔 구역은 버리지 않도록
+        self.gravity_solver = gravity_solver
+        self.chunks = OrderedDict()
+        self.center, self.resident = None, []
+        self.planets = self.fuelpods = None
+        self.generated = self.evicted = 0
+
+    def chunk_key(self, pos):
+        """ pos가 속한 구역 좌표. (0, 0) 구역은 원점을 중심으로 합니다. """
+        return (math.floor(pos[0] / self.chunk_size + 0.5), math.floor(pos[1] / self.chunk_size + 0.5))
+
+    def _generate(self, key):
+        rng = np.random.default_rng([self.seed, key[0] % 2 ** 32, key[1] % 2 ** 32])
+        center = np.array(key, dtype=float) * self.chunk_size
+        half = self.chunk_size / 2
+        total = sum(CHUNK_PLANET_COUNTS.values())
+        # 구역 가장자리에서 간격의 절반만큼 안쪽에 놓아 옆 구역 행성과도 간격이 지켜지게 합니다
+        spacing = PLANET_RADIUS * 2 + 80
+        pos = place_points(rng, total, spacing, half - spacing / 2, PLANET_SAFE_DISTANCE, center=center)
+        vel = rng.uniform(-20, 20, (total, 2)).astype(np.float32)
+        type_id = np.repeat(np.arange(len(PLANET_TYPE_NAMES), dtype=np.uint8)[[PLANET_TYPE_NAMES.index(name) for name in CHUNK_PLANET_COUNTS]],
+                            list(CHUNK_PLANET_COUNTS.values()))
+        pod_pos = rng.uniform(-half, half, (CHUNK_FUEL_POD_COUNT, 2)) + center
+        self.generated += 1
+        return Chunk(key, pos, vel, type_id, pod_pos)
+
+    def _chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None: chunk = self.chunks[key] = self._generate(key)
+        self.chunks.move_to_end(key)
+        return chunk
+
+    def _store(self):
+        """ 지금 묶여 있는 시스템의 행성 위치·속도를 각 구역 배열에 돌려 놓고, 수집한 탱크는 구역에서 뺍니다. """
+        planet_start = pod_start = 0
+        for key in self.resident:
+            chunk = self.chunks[key]
+            planet_end, pod_end = planet_start + len(chunk.pos), pod_start + len(chunk.pod_pos)
+            chunk.pos[:], chunk.vel[:] = self.planets.pos[planet_start:planet_end], self.planets.vel[planet_start:planet_end]
+            kept = ~self.fuelpods.collected[pod_start:pod_end]
+            if not kept.all(): self.chunks[key] = chunk._replace(pod_pos=chunk.pod_pos[kept])
+            planet_start, pod_start = planet_end, pod_end
+
+    def follow(self, pos):
+        """ pos 주변 구역을 불러 (행성, 연료 탱크) 시스템을 돌려줍니다. 같은 구역 안에서는 기존 시스템을 그대로 돌려줍니다. """
+        key = self.chunk_key(pos)
+        if key == self.center: return self.planets, self.fuelpods
+        if self.planets is not None: self._store()
+        self.center = key
+        self.resident = [(key[0] + dx, key[1] + dy) for dx in range(-self.radius, self.radius + 1) for dy in range(-self.radius, self.radius + 1)]
+        chunks = [self._chunk(k) for k in self.resident]
+        while len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)
+            self.evicted += 1
+        half = self.chunk_size / 2
+        lo = np.concatenate([np.broadcast_to(np.array(c.key, dtype=float) * self.chunk_size - half, c.pos.shape) for c in chunks])
+        self.planets = PlanetSystem.from_arrays(np.concatenate([c.pos for c in chunks]), np.concatenate([c.vel for c in chunks]),
+                                                np.concatenate([c.type_id for c in chunks]), (lo, lo + self.chunk_size))
+        if self.gravity_solver: self.planets.configure_gravity(self.gravity_solver)
+        pod_pos = np.concatenate([c.pod_pos for c in chunks])
+        self.fuelpods = FuelPodSystem.from_arrays(pod_pos, np.zeros(len(pod_pos), dtype=bool))
+        return self.planets, self.fuelpods
+
+# --- 월드 렌더링 ---
+# 색상·반지름별로 한 번만 그려 두는 원 스프라이트
+_sprite_cache = {}
+
+def circle_sprite(color, radius):
+    sprite = _sprite_cache.get((color, radius))
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        if pygame.display.get_surface() is not None: sprite = sprite.convert_alpha()
+        _sprite_cache[(color, radius)] = sprite
+    return sprite
+
+# 마지막 프레임에 그린 개수와 화면 밖이라 건너뛴 개수
+RenderStats = namedtuple("RenderStats", "drawn culled")
+render_stats = RenderStats(0, 0)
+
+def _sprite_blits(points, ids, sprites, radius, camera_offset):
+    """ 월드 좌표 points[ids]를 화면 좌상단 좌표로 바꿔 (스프라이트, 좌표) 목록을 만듭니다. """
+    top_left = points[ids] - (camera_offset[0] - WIDTH // 2 + radius, camera_offset[1] - HEIGHT // 2 + radius)
+    return list(zip(sprites, top_left.tolist()))
+
+def draw_world(surface, ship, planets, fuelpods, camera_offset, ship_pos=None):
+    """ 화면 안에 걸치는 행성·연료 탱크와 우주선을 캐시된 스프라이트로 한 번의 blits 호출에 그립니다.
+    ship_pos를 주면 우주선을 그 위치(보간된 위치)에 그립니다. """
+    global render_stats
+    planet_ids, pod_ids = planets.visible_ids(camera_offset), fuelpods.visible_ids(camera_offset)
+    planet_sprites = [circle_sprite(PLANET_TYPES[name][1], PLANET_RADIUS) for name in PLANET_TYPE_NAMES]
+    blits = _sprite_blits(planets.pos, planet_ids, [planet_sprites[t] for t in planets.type_id[planet_ids]], PLANET_RADIUS, camera_offset)
+    blits += _sprite_blits(fuelpods.pos, pod_ids, [circle_sprite(FUEL_POD_COLOR, FUEL_POD_RADIUS)] * len(pod_ids), FUEL_POD_RADIUS, camera_offset)
+    ship_sprite = ship.sprite()
+    ship_pos = ship.pos if ship_pos is None else ship_pos
+    blits.append((ship_sprite, ship_sprite.get_rect(center=ship_pos - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2))))
+    surface.blits(blits, doreturn=False)
+    total = len(planets) + fuelpods.remaining + 1
+    render_stats = RenderStats(len(blits), total - len(blits))
+    return render_stats
 
 def draw_warning(surface, ship, planets, camera_offset):
-    for planet in planets:
-        if (ship.pos - planet.pos).length() < WARNING_DISTANCE + PLANET_RADIUS:
-            draw_pos = planet.pos - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
-            pygame.draw.circle(surface, WARNING_COLOR, draw_pos, PLANET_RADIUS + 10, 2)
+    for i in planets.proximity(ship.pos).warnings:
+        draw_pos = pygame.Vector2(*planets.pos[i]) - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
+        pygame.draw.circle(surface, WARNING_COLOR, draw_pos, PLANET_RADIUS + 10, 2)
+
+class Minimap:
+    """ 프레임마다 새로 만들지 않고 재사용하는 미니맵.
+    우주선 주변의 월드 영역(window)을 축소한 레이어를 들고 있다가 매 프레임 우주선 위치에 맞춰 잘라 붙입니다.
+    경계선과 연료 탱크는 탱크가 수집되거나 window가 옮겨질 때만, 행성은 refresh_rate 간격으로만 다시 그리므로
+    프레임당 비용은 맵 크기나 행성 수와 상관없이 일정합니다. """
+    def __init__(self, refresh_rate=MINIMAP_REFRESH_RATE):
+        self.refresh_rate = refresh_rate
+        self.surface = self.static_layer = self.layer = None
+        self.center = None # window 중심 (월드 좌표)
+        self._static_key, self._next_refresh = None, 0.0
+
+    def _resize(self, size):
+        width, height = size
+        # window는 미니맵이 보여 주는 영역보다 사방으로 절반씩 넓게 잡아 우주선이 조금 움직여도 다시 그리지 않습니다
+        self.margin = pygame.Vector2(width, height) / 2 / MINIMAP_SCALE
+        layer_size = (width * 2, height * 2)
+        self.surface = pygame.Surface(size)
+        self.static_layer, self.layer = pygame.Surface(layer_size), pygame.Surface(layer_size)
+        self.center, self._static_key = None, None
+
+    def _to_layer(self, points):
+        half = pygame.Vector2(self.layer.get_size()) / 2
+        return (points - (self.center.x, self.center.y)) * MINIMAP_SCALE + (half.x, half.y)
+
+    def _window_ids(self, system):
+        half = self.margin * 2
+        return system.grid.query_rect(self.center.x - half.x, self.center.y - half.y, self.center.x + half.x, self.center.y + half.y)
+
+    def _dots(self, layer, system, ids, sprites, radius):
+        top_left = self._to_layer(system.pos[ids]) - radius
+        layer.blits(list(zip(sprites, top_left.tolist())), doreturn=False)
+
+    def _draw_static(self, fuelpods, bounded=True):
+        self.static_layer.fill(MINIMAP_COLOR)
+        if bounded:
+            top_left = self._to_layer(np.array([-MAP_HALF, -MAP_HALF], dtype=float))
+            map_size_scaled = MAP_SIZE * MINIMAP_SCALE
+            pygame.draw.rect(self.static_layer, WARNING_COLOR, (*top_left, map_size_scaled, map_size_scaled), 2)
+        ids = self._window_ids(fuelpods)
+        ids = ids[~fuelpods.collected[ids]]
+        self._dots(self.static_layer, fuelpods, ids, [circle_sprite(FUEL_POD_COLOR, 2)] * len(ids), 2)
+
+    def _draw_planets(self, planets):
+        self.layer.blit(self.static_layer, (0, 0))
+        sprites = [circle_sprite(PLANET_TYPES[name][1], 3) for name in PLANET_TYPE_NAMES]
+        ids = self._window_ids(planets)
+        self._dots(self.layer, planets, ids, [sprites[t] for t in planets.type_id[ids]], 3)
+
+    def draw(self, surface, ship, planets, fuelpods, now=None):
+        now = time.perf_counter() if now is None else now
+        size = (int(WIDTH * 0.25), int(HEIGHT * 0.25))
+        if self.surface is None or self.surface.get_size() != size: self._resize(size)
+        offset = ship.pos - self.center if self.center is not None else None
+        if offset is None or abs(offset.x) > self.margin.x or abs(offset.y) > self.margin.y:
+            self.center, self._static_key = pygame.Vector2(ship.pos), None
+        static_key = (fuelpods, fuelpods.remaining)
+        if static_key != self._static_key:
+            self._draw_static(fuelpods, ship.bounded)
+            self._static_key, self._next_refresh = static_key, 0.0
+        if now >= self._next_refresh:
+            self._draw_planets(planets)
+            self._next_refresh = now + 1 / self.refresh_rate
+        # window 레이어에서 우주선을 중심으로 미니맵 크기만큼 잘라 붙입니다
+        ship_on_layer = self._to_layer(np.array([ship.pos.x, ship.pos.y]))
+        self.surface.fill(MINIMAP_COLOR)
+        self.surface.blit(self.layer, (0, 0), pygame.Rect(ship_on_layer[0] - size[0] // 2, ship_on_layer[1] - size[1] // 2, *size))
+        pygame.draw.circle(self.surface, SHIP_COLOR, (size[0] // 2, size[1] // 2), 4)
+        surface.blit(self.surface, (WIDTH - size[0] - 10, HEIGHT - size[1] - 10))
+
+minimap = Minimap()
 
 def draw_minimap(surface, ship, planets, fuelpods):
-    minimap_width, minimap_height = int(WIDTH * 0.25), int(HEIGHT * 0.25)
-    minimap = pygame.Surface((minimap_width, minimap_height)); minimap.fill(MINIMAP_COLOR)
-    center = pygame.Vector2(minimap_width // 2, minimap_height // 2)
-    map_top_left_scaled = pygame.Vector2(-MAP_HALF - ship.pos.x, -MAP_HALF - ship.pos.y) * MINIMAP_SCALE + center
-    map_size_scaled = MAP_SIZE * MINIMAP_SCALE
-    pygame.draw.rect(minimap, WARNING_COLOR, (*map_top_left_scaled, map_size_scaled, map_size_scaled), 2)
-    for p in planets: pygame.draw.circle(minimap, p.color, center + (p.pos - ship.pos) * MINIMAP_SCALE, 3)
-    for pod in fuelpods:
-        if not pod.collected: pygame.draw.circle(minimap, (100, 255, 100), center + (pod.pos - ship.pos) * MINIMAP_SCALE, 2)
-    pygame.draw.circle(minimap, SHIP_COLOR, center, 4)
-    surface.blit(minimap, (WIDTH - minimap_width - 10, HEIGHT - minimap_height - 10))
+    minimap.draw(surface, ship, planets, fuelpods)
 
 def draw_map_boundary_warning(surface, camera_offset):
     top_left = pygame.Vector2(-MAP_HALF, -MAP_HALF) - camera_offset + pygame.Vector2(WIDTH // 2, HEIGHT // 2)
     pygame.draw.rect(surface, WARNING_COLOR, (*top_left, MAP_SIZE, MAP_SIZE), 3)
 
-def load_highscore():
-    if os.path.exists(HIGHSCORE_FILE):
-        with open(HIGHSCORE_FILE, "r", encoding="utf-8") as f:
-            try: return float(f.read())
-            except: return 0
-    return 0
+# --- 프로필 저장소 ---
+def user_data_dir():
+    """ 운영체제별 사용자 데이터 폴더. GRAVITY_GAME_DATA_DIR 환경 변수로 바꿀 수 있습니다. """
+    path = os.environ.get("GRAVITY_GAME_DATA_DIR")
+    if not path:
+        if sys.platform == "win32": base = os.environ.get("APPDATA") or os.path.expanduser("~")
+        elif sys.platform == "darwin": base = os.path.expanduser("~/Library/Application Support")
+        else: base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        path = os.path.join(base, APP_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class ProfileStore:
+    """ 플레이어별 프로필(최고 기록, 코인, 업그레이드)과 판 기록을 WAL 모드 SQLite 파일 하나에 저장합니다.
+    읽기는 메모리 캐시와 메인 스레드의 연결로 바로 하고, 쓰기는 큐에 넣기만 하면 작업 스레드가
+    flush_interval 동안 모았다가 트랜잭션 하나로 기록합니다. 같은 프로필을 여러 번 바꾸면 마지막 값만 쓰고,
+    프로필은 항상 행 전체를 한 번에 쓰므로 도중에 꺼져도 반쯤 저장된 프로필은 남지 않습니다.
+    이전 버전의 최고 기록(highscore.txt)은 누구의 것인지 모르므로 어느 프로필에도 넣지 않고 전체 최고 기록에만 셉니다. """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS profiles (name TEXT PRIMARY KEY, highscore REAL NOT NULL, points INTEGER NOT NULL,"
+        " max_fuel INTEGER NOT NULL, fuel_pod_recharge INTEGER NOT NULL, thrust INTEGER NOT NULL, updated REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, name TEXT NOT NULL, score REAL NOT NULL, time_alive REAL NOT NULL,"
+        " pods_collected INTEGER NOT NULL, seed INTEGER, ended REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS runs_by_name ON runs (name, ended)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    )
+    UPGRADE_KEYS = ("points", "max_fuel", "fuel_pod_recharge", "thrust")
+
+    def __init__(self, path=None, legacy_highscore_file=HIGHSCORE_FILE, flush_interval=PROFILE_FLUSH_INTERVAL):
+        self.path = path or os.path.join(user_data_dir(), PROFILE_DB_FILE)
+        self.flush_interval = flush_interval
+        self.conn = self._connect()
+        self._migrate(legacy_highscore_file)
+        self.profiles = {} # 이름 -> {"highscore", "upgrades"}: 아직 기록되지 않은 변경도 바로 보입니다
+        self._profile_writes, self._run_writes, self._replay_writes = {}, [], []
+        self._deadline, self._writing = 0.0, False
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="ProfileStore", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL에서는 프로그램이 죽어도 커밋된 트랜잭션은 남습니다
+        return conn
+
+    def _migrate(self, legacy_highscore_file):
+        """ 처음 열 때 표를 만들고, 이전 버전의 최고 기록 파일이 있으면 meta에 옮겨 둡니다. """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                for statement in self.SCHEMA: self.conn.execute(statement)
+                legacy = _read_legacy_highscore(legacy_highscore_file)
+                if legacy > 0: self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_highscore', ?)", (repr(legacy),))
+                self.conn.execute("PRAGMA user_version = 1")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def load_profile(self, name):
+        """ name의 프로필 {"highscore", "upgrades"}. 처음 보는 이름이면 기본값으로 새로 만듭니다. """
+        profile = self.profiles.get(name)
+        if profile is not None: return profile
+        row = self.conn.execute("SELECT highscore, points, max_fuel, fuel_pod_recharge, thrust FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            profile = self.profiles[name] = {"highscore": row[0], "upgrades": dict(zip(self.UPGRADE_KEYS, row[1:]))}
+            return profile
+        profile = self.profiles[name] = {"highscore": 0, "upgrades": dict(UPGRADE_DEFAULTS)}
+        self._queue(lambda: self._profile_writes.__setitem__(name, profile))
+        return profile
+
+    def save_profile(self, name, highscore=None, upgrades=None):
+        """ 프로필의 최고 기록이나 업그레이드(코인 포함)를 바꿉니다. 바로 돌아오고, 기록은 작업 스레드가 합니다. """
+        profile = self.load_profile(name)
+        if highscore is not None: profile["highscore"] = highscore
+        if upgrades is not None: profile["upgrades"] = {key: upgrades[key] for key in self.UPGRADE_KEYS}
+        self._queue(lambda: self._profile_writes.__setitem__(name, dict(profile)))
+
+    def record_run(self, name, score, time_alive, pods_collected=0, seed=None, replay=None):
+        """ 끝난 판 하나를 기록에 추가합니다. replay를 주면 작업 스레드가 save_replay로 파일에 저장합니다. """
+        def change():
+            self._run_writes.append((name, score, time_alive, pods_collected, seed, time.time()))
+            if replay is not None: self._replay_writes.append(replay)
+        self._queue(change)
+
+    def highscore(self, name=None):
+        """ name의 최고 기록. name이 없으면 모든 플레이어와 이전 버전 기록 중 최고 기록입니다. """
+        if name is not None: return self.load_profile(name)["highscore"]
+        row = self.conn.execute("SELECT MAX(highscore) FROM profiles").fetchone()
+        legacy = self.conn.execute("SELECT value FROM meta WHERE key = 'legacy_highscore'").fetchone()
+        scores = [row[0] or 0, float(legacy[0]) if legacy else 0] + [p["highscore"] for p in self.profiles.values()]
+        return max(scores)
+
+    def _pending(self):
+        return bool(self._profile_writes or self._run_writes or self._replay_writes)
+
+    def _queue(self, change):
+        with self.condition:
+            if not self._pending(): self._deadline = time.monotonic() + self.flush_interval
+            change()
+            self.condition.notify()
+
+    def flush(self, timeout=None):
+        """ 모아 둔 쓰기를 바로 기록하고 끝날 때까지 기다립니다. 다 썼으면 True. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            self._deadline = 0.0
+            self.condition.notify()
+            while self._pending() or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """ 남은 쓰기를 기록하고 작업 스레드를 멈춥니다. """
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        self.conn.close()
 
-def save_highscore(score):
-    with open(HIGHSCORE_FILE, "w", encoding="utf-8") as f: f.write(str(score))
+    def _run(self):
+        conn = self._connect()
+        while True:
+            with self.condition:
+                while not self.stopping and (not self._pending() or time.monotonic() < self._deadline):
+                    self.condition.wait(None if not self._pending() else self._deadline - time.monotonic())
+                if not self._pending() and self.stopping: break
+                profiles, runs, replays = self._profile_writes, self._run_writes, self._replay_writes
+                self._profile_writes, self._run_writes, self._replay_writes, self._writing = {}, [], [], True
+            for replay in replays:
+                try:
+                    print(f"리플레이 저장: {save_replay(replay)}")
+                except OSError as e:
+                    print(f"리플레이 저장에 실패했습니다: {e}")
+            try:
+                self._write(conn, profiles, runs)
+            except sqlite3.Error as e:
+                print(f"프로필 저장에 실패했습니다: {e}")
+                with self.condition:
+                    # 그 사이 다시 바뀐 프로필은 새 값을 남기고, 나머지는 다음에 다시 씁니다
+                    self._profile_writes = dict(profiles, **self._profile_writes)
+                    self._run_writes = runs + self._run_writes
+                    self._deadline = time.monotonic() + self.flush_interval
+                    if self.stopping: self._profile_writes, self._run_writes = {}, []
+            with self.condition:
+                self._writing = False
+                self.condition.notify_all()
+        conn.close()
 
-def send_score_to_server(name, score):
-    url = "https://gravity-game-backend.onrender.com/add_score"
-    data = {"name": name, "score": score}
+    def _write(self, conn, profiles, runs):
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET highscore = excluded.highscore,"
+                " points = excluded.points, max_fuel = excluded.max_fuel, fuel_pod_recharge = excluded.fuel_pod_recharge,"
+                " thrust = excluded.thrust, updated = excluded.updated",
+                [(name, p["highscore"], *(p["upgrades"][key] for key in self.UPGRADE_KEYS), now) for name, p in profiles.items()])
+            conn.executemany("INSERT INTO runs (name, score, time_alive, pods_collected, seed, ended) VALUES (?, ?, ?, ?, ?, ?)", runs)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+def _read_legacy_highscore(path):
     try:
-        response = requests.post(url, json=data, timeout=5, verify=certifi.where())
-        if response.status_code == 200: print("점수가 성공적으로 서버에 등록되었습니다.")
-        else: print(f"서버에 점수 등록 실패: {response.status_code}")
-    except requests.exceptions.RequestException as e:
-        print(f"서버 연결에 실패했습니다: {e}")
+        with open(path, "r", encoding="utf-8") as f: return float(f.read())
+    except (OSError, ValueError):
+        return 0
+
+profile_store = None
+
+def get_profile_store():
+    """ 프로필 저장소를 처음 쓸 때 엽니다. 헤드리스 시뮬레이션은 저장소를 열지 않습니다. """
+    global profile_store
+    if profile_store is None: profile_store = ProfileStore()
+    return profile_store
+
+def load_highscore(name=None):
+    """ name의 최고 기록 (없으면 모든 플레이어 중 최고). """
+    return get_profile_store().highscore(name)
+
+def save_highscore(score, name):
+    """ name 프로필의 최고 기록을 바꿉니다. 기록은 프로필 저장소의 작업 스레드가 합니다. """
+    get_profile_store().save_profile(name, highscore=score)
+
+class ScoreSubmitter:
+    """ 점수 전송을 게임 루프와 분리된 작업 스레드에서 처리합니다.
+    보낼 점수는 outbox 파일에 먼저 기록되므로 전송에 실패하거나 게임이 꺼져도 다음 실행 때 다시 보냅니다.
+    실패하면 지수적으로 늘어나는 간격으로 재시도합니다. 서버가 여러 점수를 한 번에 받는 /add_scores를
+    지원하면 모아서 보내고, 지원하지 않으면(404/405) /add_score로 하나씩 보냅니다.
+    서버가 거부한 점수(SCORE_RETRY_STATUSES 밖의 4xx)는 기록을 남기고 버려서 뒤의 점수를 막지 않습니다. """
+    def __init__(self, base_url=SCORE_SERVER_URL, outbox_path=None, batch_size=SCORE_BATCH_SIZE, verify=None):
+        self.base_url, self.batch_size = base_url.rstrip("/"), batch_size
+        self.outbox_path = outbox_path or os.path.join(user_data_dir(), SCORE_OUTBOX_FILE)
+        self.session = requests.Session()
+        self.session.verify = certifi.where() if verify is None else verify
+        self.batch_supported = None # 아직 모름
+        self.pending = self._load_outbox()
+        self.failures, self.next_attempt = 0, 0.0
+        self._dirty = False
+        self._outbox_lock = threading.Lock()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="ScoreSubmitter", daemon=True)
+        self.thread.start()
+
+    def submit(self, name, score, replay=None):
+        """ 점수를 큐에 넣고 바로 돌아옵니다. 디스크 기록과 네트워크 전송은 작업 스레드가 합니다.
+        replay(Replay)를 주면 서버가 점수를 다시 계산해 볼 수 있도록 base64로 같이 보냅니다. """
+        entry = {"id": uuid.uuid4().hex, "name": name, "score": score}
+        if replay is not None: entry["replay"] = base64.b64encode(replay.to_bytes()).decode("ascii")
+        with self.condition:
+            self.pending.append(entry)
+            self._dirty = True
+            self.next_attempt = 0.0
+            self.condition.notify()
+
+    def flush(self, timeout=None):
+        """ 큐가 빌 때까지 기다립니다. 모두 보냈으면 True. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=1.0):
+        """ 작업 스레드를 멈추고, 아직 outbox에 쓰지 않은 점수가 있으면 돌아가기 전에 씁니다. """
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        with self.condition:
+            snapshot, self._dirty = list(self.pending) if self._dirty else None, False
+        if snapshot is not None: self._save_outbox(snapshot)
+
+    def _load_outbox(self):
+        try:
+            with open(self.outbox_path, "r", encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_outbox(self, entries):
+        """ outbox 파일을 바꿉니다. 쓰지 못하면 메모리의 큐로 계속 보내고, 다음 시도 때 다시 씁니다. """
+        tmp_path = self.outbox_path + ".tmp"
+        try:
+            with self._outbox_lock: # stop()과 작업 스레드가 같은 임시 파일에 겹쳐 쓰지 않도록
+                with open(tmp_path, "w", encoding="utf-8") as f: json.dump(entries, f)
+                os.replace(tmp_path, self.outbox_path)
+        except OSError as e:
+            print(f"점수 outbox 저장에 실패했습니다: {e}")
+            with self.condition: self._dirty = True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopping and (not self.pending or time.monotonic() < self.next_attempt):
+                    self.condition.wait(None if not self.pending else self.next_attempt - time.monotonic())
+                if self.stopping: return
+                batch, dirty, self._dirty = list(self.pending[:self.batch_size]), self._dirty, False
+                snapshot = list(self.pending) if dirty else None
+            if snapshot is not None: self._save_outbox(snapshot)
+            sent = self._send(batch)
+            with self.condition:
+                sent_ids = {entry["id"] for entry in batch[:sent]}
+                self.pending = [entry for entry in self.pending if entry["id"] not in sent_ids]
+                if sent < len(batch):
+                    self.failures += 1
+                    self.next_attempt = time.monotonic() + min(SCORE_RETRY_BASE * 2 ** (self.failures - 1), SCORE_RETRY_MAX)
+                else:
+                    self.failures = 0
+                snapshot = list(self.pending)
+            if sent: self._save_outbox(snapshot)
+            with self.condition:
+                self.condition.notify_all()
+
+    def _send(self, batch):
+        """ batch를 앞에서부터 보내고, 끝난(등록됐거나 서버가 거부한) 개수를 돌려줍니다. """
+        try:
+            if len(batch) > 1 and self.batch_supported is not False:
+                response = self.session.post(f"{self.base_url}/add_scores", json={"scores": batch}, timeout=5)
+                if response.status_code == 200:
+                    self.batch_supported = True
+                    print(f"점수 {len(batch)}개가 서버에 등록되었습니다.")
+                    return len(batch)
+                if response.status_code in (404, 405): self.batch_supported = False
+                elif _score_rejected(response.status_code):
+                    print(f"서버가 점수 묶음을 거부했습니다 ({response.status_code}). 하나씩 다시 보냅니다.")
+                else:
+                    print(f"서버에 점수 등록 실패: {response.status_code}")
+                    return 0
+            for sent, entry in enumerate(batch):
+                response = self.session.post(f"{self.base_url}/add_score", json=entry, timeout=5)
+                if _score_rejected(response.status_code):
+                    print(f"서버가 점수를 거부해 버립니다 ({response.status_code}): {entry['name']} {entry['score']}")
+                elif response.status_code != 200:
+                    print(f"서버에 점수 등록 실패: {response.status_code}")
+                    return sent
+                else:
+                    print("점수가 성공적으로 서버에 등록되었습니다.")
+            return len(batch)
+        except requests.exceptions.RequestException as e:
+            print(f"서버 연결에 실패했습니다: {e}")
+            return 0
+
+def _score_rejected(status):
+    """ 다시 보내도 받아들여지지 않을 응답인지. """
+    return 400 <= status < 500 and status not in SCORE_RETRY_STATUSES
+
+score_submitter = None
+
+def get_score_submitter():
+    """ 점수 전송기를 처음 쓸 때 만듭니다. 게임은 시작할 때 불러서 지난 실행의 outbox를 바로 다시 보냅니다. """
+    global score_submitter
+    if score_submitter is None: score_submitter = ScoreSubmitter()
+    return score_submitter
+
+def send_score_to_server(name, score, replay=None):
+    """ 점수를 백그라운드 전송 큐에 넣습니다. 게임 루프는 네트워크를 기다리지 않습니다. """
+    get_score_submitter().submit(name, score, replay)
+
+# --- 프레임 프로파일러 ---
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class FrameProfiler:
+    """ 프레임을 단계(stage)별로 나눠 시간을 재고, 최근 window 프레임의 p50/p95/p99를 계산합니다.
+    프레임마다 새로 할당된 메모리 블록 수(sys.getallocatedblocks 증가분)와 GC 실행 횟수도 셉니다.
+    꺼져 있으면 stage()는 공유된 빈 컨텍스트를 돌려주므로 비용이 거의 없습니다.
+    F3으로 켜고 오버레이를 보이며, F4로 사용자 데이터 폴더에 CSV/JSON 파일을 내보냅니다. """
+    def __init__(self, window=PROFILER_WINDOW, enabled=False):
+        self.window, self.enabled = window, enabled
+        self.history = deque(maxlen=window) # 최근 프레임별 {단계 이름: 시간(초)}
+        self.current = {}
+        self.frames = 0
+        self._overlay, self._overlay_time = None, 0.0
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def begin_frame(self):
+        if not self.enabled: return
+        self.current = {}
+        self._frame_start = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+        self._collections = sum(stat["collections"] for stat in gc.get_stats())
+
+    def end_frame(self):
+        if not self.enabled: return
+        self.current["frame"] = time.perf_counter() - self._frame_start
+        self.current["alloc_blocks"] = sys.getallocatedblocks() - self._blocks
+        self.current["gc_collections"] = sum(stat["collections"] for stat in gc.get_stats()) - self._collections
+        self.history.append(self.current)
+        self.frames += 1
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.history.clear()
+        self.current, self._overlay = {}, None
+        self.begin_frame() # 프레임 중간에 켜도 end_frame()이 짝을 찾도록
+
+    def summary(self):
+        """ 단계별 {count, mean, p50, p95, p99}. 시간은 밀리초, alloc_blocks/gc_collections는 개수입니다. """
+        samples = {}
+        for frame in self.history:
+            for name, value in frame.items(): samples.setdefault(name, []).append(value)
+        result = {}
+        for name, values in samples.items():
+            values = np.asarray(values, dtype=float) * (1 if name in ("alloc_blocks", "gc_collections") else 1000)
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            result[name] = {"count": len(values), "mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return result
+
+    def export(self, path):
+        """ .csv면 프레임별 원본 값을, 그 외에는 요약(summary)을 JSON으로 저장합니다. """
+        if path.endswith(".csv"):
+            names = sorted({name for frame in self.history for name in frame})
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, names, restval="")
+                writer.writeheader()
+                writer.writerows(self.history)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"frames": self.frames, "window": self.window, "stages": self.summary()}, f, indent=2)
+        return path
+
+    def draw_overlay(self, surface, extra_lines=()):
+        if not self.enabled: return
+        now = time.perf_counter()
+        if self._overlay is None or now - self._overlay_time >= PROFILER_OVERLAY_INTERVAL:
+            lines = [f"{name:<14} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  p99 {s['p99']:7.2f}" for name, s in sorted(self.summary().items())]
+            lines += list(extra_lines)
+            font = get_font(14)
+            self._overlay = pygame.Surface((360, 18 * len(lines) + 8), pygame.SRCALPHA)
+            self._overlay.fill((0, 0, 0, 170))
+            for i, line in enumerate(lines):
+                self._overlay.blit(font.render(line, True, WHITE), (6, 4 + 18 * i))
+            self._overlay_time = now
+        surface.blit(self._overlay, (10, 70))
+
+profiler = FrameProfiler()
+
+def create_world(rng=random, upgrades=None):
+    """ 새 판의 (우주선, 행성, 연료 탱크)를 만듭니다. """
+    return Spaceship(0, 0, upgrades), generate_planets(rng), generate_fuelpods(FUEL_POD_COUNT, rng)
+
+def create_universe(rng=random, upgrades=None, gravity_solver=None):
+    """ 무한 우주 모드의 새 판: (경계 없는 우주선, ChunkedUniverse). 행성과 탱크는 universe.follow()로 얻습니다. """
+    ship = Spaceship(0, 0, upgrades)
+    ship.bounded = False
+    return ship, ChunkedUniverse(rng.getrandbits(64), gravity_solver=gravity_solver)
+
+def start_world(rng=random, upgrades=None, world_mode=None, gravity_solver=None):
+    """ world_mode(기본: WORLD_MODE)에 맞는 새 판을 (우주선, 행성, 연료 탱크, 무한 우주 또는 None)으로 만듭니다. """
+    if (world_mode or WORLD_MODE) == "chunked":
+        ship, universe = create_universe(rng, upgrades, gravity_solver)
+        return (ship, *universe.follow(ship.pos), universe)
+    ship, planets, fuelpods = create_world(rng, upgrades)
+    if gravity_solver: planets.configure_gravity(gravity_solver)
+    return ship, planets, fuelpods, None
+
+def substep_count(ship, planets, dt):
+    """ 빠르게 움직이거나 강한 중력장 안에 있을 때 행성을 뚫고 지나가지 않도록 dt를 몇 번으로 나눌지 정합니다.
+    이동 거리와 중력 세기 중 더 많이 나눠야 하는 쪽을 따릅니다. """
+    if not ship.alive: return 1
+    acc = math.hypot(*planets.acceleration(ship.pos))
+    travel = math.hypot(ship.vel.x, ship.vel.y) * dt + 0.5 * acc * dt * dt
+    return max(1, min(MAX_SUBSTEPS, max(math.ceil(travel / SUBSTEP_MAX_DISTANCE), math.ceil(acc / SUBSTEP_ACCELERATION))))
+
+def step_world(ship, planets, fuelpods, keys, dt, integrator=INTEGRATOR):
+    """ 한 틱을 진행합니다. 행성은 한 틱에 1픽셀도 움직이지 않으므로 틱마다 한 번만 옮기고,
+    우주선·연료 탱크·충돌 판정만 필요하면 substep_count()만큼 잘게 나눠 진행합니다.
+    이번 틱에 우주선이 행성과 충돌했으면 True를 돌려줍니다. """
+    with profiler.stage("planets"): planets.update(dt)
+    substeps = substep_count(ship, planets, dt)
+    for _ in range(substeps):
+        with profiler.stage("ship"): ship.update(planets, dt / substeps, keys, integrator)
+        with profiler.stage("collect"): fuelpods.collect(ship)
+        with profiler.stage("collision"):
+            if ship.alive and ship.check_collision(planets): return True
+    return False
+
+class PhysicsStepper:
+    """ 누적기(accumulator) 방식의 고정 시간 간격 진행기.
+    화면 프레임 시간만큼 시간을 쌓아 두었다가 dt 단위로 step_world()를 부르고, 남은 시간 비율(alpha)로
+    직전 스텝과 현재 스텝 사이의 우주선 위치를 보간해 그립니다. 행성은 한 스텝에 1픽셀도 움직이지 않으므로
+    보간하지 않습니다. universe가 있으면 스텝마다 우주선 주변 구역을 불러 오고,
+    recorder(Replay)가 있으면 우주선이 살아 있는 동안 스텝마다 키 비트마스크를 기록합니다. """
+    def __init__(self, dt=PHYSICS_DT, integrator=INTEGRATOR, max_frame_time=MAX_FRAME_TIME, universe=None, recorder=None):
+        if integrator not in INTEGRATORS: raise ValueError(f"unknown integrator: {integrator}")
+        self.dt, self.integrator, self.max_frame_time = dt, integrator, max_frame_time
+        self.universe, self.recorder = universe, recorder
+        self.accumulator, self.alpha, self.steps = 0.0, 0.0, 0
+        self.prev_ship_pos = None
+
+    def advance(self, frame_time, ship, planets, fuelpods, keys):
+        """ frame_time만큼 물리를 진행합니다. 그 사이 충돌했으면 True.
+        recorder를 쓸 때 keys는 KeyState여야 합니다. """
+        self.accumulator += min(frame_time, self.max_frame_time)
+        collided = False
+        while self.accumulator >= self.dt:
+            self.prev_ship_pos = pygame.Vector2(ship.pos)
+            if self.universe is not None: planets, fuelpods = self.universe.follow(ship.pos)
+            if self.recorder is not None and ship.alive: self.recorder.record(keys.mask)
+            collided = step_world(ship, planets, fuelpods, keys, self.dt, self.integrator) or collided
+            self.accumulator -= self.dt
+            self.steps += 1
+        self.alpha = self.accumulator / self.dt
+        return collided
+
+    def ship_render_pos(self, ship):
+        if self.prev_ship_pos is None: return pygame.Vector2(ship.pos)
+        return self.prev_ship_pos.lerp(ship.pos, self.alpha)
 
 def reset_game():
-    global ship, planets, fuelpods, game_over, explosion_timer, shake_timer
-    ship, planets, fuelpods = Spaceship(0, 0), generate_planets(), generate_fuelpods(FUEL_POD_COUNT)
+    """ 새 판을 시작합니다. 판마다 시드를 새로 뽑아 리플레이에 기록합니다. """
+    global ship, planets, fuelpods, universe, stepper, replay, game_over, explosion_timer, shake_timer
+    replay = Replay(random.getrandbits(63))
+    ship, planets, fuelpods, universe = start_world(random.Random(replay.seed), dict(upgrade_data, **replay.upgrades))
+    stepper = PhysicsStepper(universe=universe, recorder=replay)
     game_over, explosion_timer, shake_timer = False, 0, 0
 
+# --- 헤드리스 시뮬레이션 ---
+# 방향키 비트마스크. 스크립트 입력과 정책 함수는 pygame.key.get_pressed() 대신 이것을 씁니다.
+KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN = 1, 2, 4, 8
+KEY_BITS = {pygame.K_LEFT: KEY_LEFT, pygame.K_RIGHT: KEY_RIGHT, pygame.K_UP: KEY_UP, pygame.K_DOWN: KEY_DOWN}
+
+class KeyState:
+    """ 비트마스크로 표현한 키 입력. keys[pygame.K_LEFT] 처럼 get_pressed() 결과와 같은 방식으로 읽습니다. """
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        return cls(sum(bit for key, bit in KEY_BITS.items() if pressed[key]))
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+SimResult = namedtuple("SimResult", "seed score time_alive fuel_used pods_collected ticks cause")
+
+def simulate(seed=None, inputs=None, policy=None, dt=PHYSICS_DT, max_time=120.0, upgrades=None, gravity_solver=None, integrator=INTEGRATOR, world_mode=None):
+    """ 창 없이 한 판을 끝까지 진행합니다.
+    입력은 틱마다 하나씩 쓰는 inputs 시퀀스(비트마스크 또는 KeyState)나
+    policy(ship, planets, fuelpods) 호출 결과로 정하며, 둘 다 없으면 아무 키도 누르지 않습니다.
+    inputs가 먼저 끝나면 이후에는 키를 누르지 않은 것으로 봅니다.
+    cause는 "collision"(행성 충돌) 또는 "timeout"(max_time 도달)입니다. """
+    upgrades = dict(upgrade_data, **(upgrades or {}))
+    ship, planets, fuelpods, universe = start_world(random.Random(seed), upgrades, world_mode, gravity_solver)
+    inputs = iter(inputs or ())
+    ticks, cause = 0, "timeout"
+    while ship.time_alive < max_time:
+        if universe is not None: planets, fuelpods = universe.follow(ship.pos)
+        keys = policy(ship, planets, fuelpods) if policy else next(inputs, 0)
+        if isinstance(keys, int): keys = KeyState(keys)
+        ticks += 1
+        if step_world(ship, planets, fuelpods, keys, dt, integrator):
+            cause = "collision"
+            break
+    return SimResult(seed, ship.distance_traveled / 10, ship.time_alive, ship.fuel_used, ship.pods_collected, ticks, cause)
+
+def idle_policy(ship, planets, fuelpods):
+    return 0
+
+def escape_policy(ship, planets, fuelpods):
+    """ 중력 가속도가 일정 이상이면 반대 방향으로 추진하는 단순한 정책. """
+    acc = planets.acceleration(ship.pos)
+    keys = 0
+    if abs(acc[0]) > 20: keys |= KEY_LEFT if acc[0] > 0 else KEY_RIGHT
+    if abs(acc[1]) > 20: keys |= KEY_UP if acc[1] > 0 else KEY_DOWN
+    return keys
+
+POLICIES = {"idle": idle_policy, "escape": escape_policy}
+
+# --- 병렬 배치 실행 ---
+BatchResult = namedtuple("BatchResult", "seed score time_alive coins cause fuel_used pods_collected")
+
+def _run_seed_chunk(seeds, policy, upgrades, max_time, gravity_solver, world_mode):
+    results = []
+    for seed in seeds:
+        r = simulate(seed, policy=policy, max_time=max_time, upgrades=upgrades, gravity_solver=gravity_solver, world_mode=world_mode)
+        results.append(BatchResult(seed, r.score, r.time_alive, score_to_coins(r.score), r.cause, r.fuel_used, r.pods_collected))
+    return results
+
+def run_batch(seeds, policy=idle_policy, upgrades=None, max_time=120.0, workers=None, chunk_size=None, gravity_solver=None, world_mode=None):
+    """ 시드별 시뮬레이션을 프로세스 풀에 나눠 실행하고, 끝나는 대로 BatchResult를 하나씩 내보냅니다.
+    seeds는 시드 목록 또는 개수(0..n-1)입니다. policy는 다른 프로세스로 넘겨야 하므로
+    모듈 최상위 함수처럼 pickle 가능한 객체여야 합니다. 결과 순서는 완료 순서입니다. """
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(seeds) // (workers * 8))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_seed_chunk, chunk, policy, upgrades, max_time, gravity_solver, world_mode) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def batch_main(argv=None):
+    """ 명령줄에서 배치 시뮬레이션을 실행하고 결과를 JSON 한 줄씩 출력합니다. """
+    parser = argparse.ArgumentParser(description="Gravity Game 헤드리스 배치 시뮬레이션")
+    parser.add_argument("--runs", type=int, default=1000, help="실행할 판 수 (시드 0..runs-1)")
+    parser.add_argument("--seed-offset", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="escape")
+    parser.add_argument("--max-time", type=float, default=120.0)
+    parser.add_argument("--solver", choices=GRAVITY_SOLVERS, default=None, help="중력 계산 방식 (기본: GRAVITY_SOLVER, 행성이 적으면 exact)")
+    parser.add_argument("--world", choices=WORLD_MODES, default=None, help="맵 방식 (기본: WORLD_MODE)")
+    parser.add_argument("--upgrade", action="append", default=[], metavar="KEY=VALUE", help="예: --upgrade thrust=150")
+    args = parser.parse_args(argv)
+    upgrades = {key: int(value) for key, value in (item.split("=", 1) for item in args.upgrade)}
+    seeds = range(args.seed_offset, args.seed_offset + args.runs)
+    causes, total_score, total_coins = {}, 0.0, 0
+    for result in run_batch(seeds, POLICIES[args.policy], upgrades, args.max_time, args.workers, gravity_solver=args.solver, world_mode=args.world):
+        print(json.dumps(result._asdict()))
+        causes[result.cause] = causes.get(result.cause, 0) + 1
+        total_score += result.score
+        total_coins += result.coins
+    summary = {"runs": args.runs, "mean_score": total_score / max(args.runs, 1), "mean_coins": total_coins / max(args.runs, 1), "causes": causes}
+    print(json.dumps(summary), file=sys.stderr)
+
+# --- 리플레이 ---
+def world_params():
+    """ 지금 맵 생성·물리 설정 (REPLAY_PARAMS) 값. """
+    return {name: json.loads(json.dumps(globals()[name])) for name in REPLAY_PARAMS}
+
+def apply_world_params(params):
+    """ 맵 생성·물리 설정을 params로 바꾸고, 원래 값을 돌려줍니다. """
+    global MAP_HALF
+    saved = world_params()
+    globals().update({name: value for name, value in params.items() if name in REPLAY_PARAMS})
+    MAP_HALF = MAP_SIZE // 2
+    return saved
+
+class Replay:
+    """ 한 판을 그대로 다시 진행하기 위한 기록: 시드, 맵 생성·물리 설정, 업그레이드, 틱마다의 키 비트마스크.
+    파일 형식은 REPLAY_MAGIC, 헤더(JSON) 길이(uint32), 헤더, 그리고 (비트마스크 uint8, 반복 횟수 uint16)
+    쌍의 연속입니다. 키 입력은 몇 초씩 그대로인 경우가 많아 반복 횟수로 묶으면 1분에 수백 바이트 정도입니다. """
+    def __init__(self, seed, params=None, upgrades=None, masks=b"", info=None):
+        self.seed = seed
+        self.params = world_params() if params is None else params
+        self.upgrades = {key: upgrade_data[key] for key in UPGRADE_LIMITS} if upgrades is None else upgrades
+        self.masks = bytearray(masks)
+        self.info = dict(info or {}) # 플레이어 이름, 기록된 점수 등 재현에 쓰이지 않는 정보
+
+    def record(self, mask):
+        self.masks.append(mask)
+
+    def to_bytes(self):
+        header = json.dumps({"seed": self.seed, "params": self.params, "upgrades": self.upgrades,
+                             "ticks": len(self.masks), "info": self.info}).encode("utf-8")
+        runs = bytearray()
+        for mask, group in groupby(self.masks):
+            count = sum(1 for _ in group)
+            while count:
+                runs += struct.pack("<BH", mask, min(count, 0xFFFF))
+                count -= min(count, 0xFFFF)
+        return REPLAY_MAGIC + struct.pack("<I", len(header)) + header + bytes(runs)
+
+    @classmethod
+    def from_bytes(cls, data, max_ticks=None):
+        """ 파일 내용에서 리플레이를 만듭니다. 형식이 틀렸거나 max_ticks보다 길면 ValueError. """
+        if data[:4] != REPLAY_MAGIC: raise ValueError("not a replay file")
+        try:
+            (header_size,) = struct.unpack_from("<I", data, 4)
+            header = json.loads(data[8:8 + header_size].decode("utf-8"))
+            ticks = header["ticks"]
+            if max_ticks is not None and ticks > max_ticks: raise ValueError(f"replay too long ({ticks} ticks)")
+            runs = list(struct.iter_unpack("<BH", data[8 + header_size:]))
+            # 반복 횟수를 다 펼치기 전에 길이를 확인합니다 (작은 파일로 큰 메모리를 쓰게 하지 않도록)
+            if sum(count for _, count in runs) != ticks: raise ValueError("truncated replay")
+            masks = b"".join(bytes([mask]) * count for mask, count in runs)
+            return cls(header["seed"], header["params"], header["upgrades"], masks, header["info"])
+        except (struct.error, KeyError, TypeError) as e:
+            raise ValueError(f"corrupt replay: {e!r}") from e
+
+    def save(self, path):
+        with open(path, "wb") as f: f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path, max_ticks=None):
+        with open(path, "rb") as f: return cls.from_bytes(f.read(), max_ticks)
+
+class ReplayPlayer:
+    """ 리플레이를 한 틱씩 다시 진행합니다. 게임과 같은 순서(구역 불러오기 → step_world)로 진행하므로
+    같은 시드·설정·입력이면 결과가 같습니다. 뒤로 감기는 처음부터 다시 계산합니다.
+    replay.params가 적용된 상태(apply_world_params)에서 써야 합니다. """
+    def __init__(self, replay):
+        self.replay = replay
+        self.restart()
+
+    def restart(self):
+        upgrades = dict(upgrade_data, **self.replay.upgrades)
+        self.ship, self.planets, self.fuelpods, self.universe = start_world(random.Random(self.replay.seed), upgrades)
+        self.tick, self.prev_ship_pos = 0, pygame.Vector2(self.ship.pos)
+
+    @property
+    def done(self):
+        return not self.ship.alive or self.tick >= len(self.replay.masks)
+
+    def step(self):
+        if self.done: return
+        self.prev_ship_pos = pygame.Vector2(self.ship.pos)
+        if self.universe is not None: self.planets, self.fuelpods = self.universe.follow(self.ship.pos)
+        keys = KeyState(self.replay.masks[self.tick])
+        self.tick += 1
+        step_world(self.ship, self.planets, self.fuelpods, keys, PHYSICS_DT, INTEGRATOR)
+
+    def seek(self, tick):
+        """ tick번째 틱 직후 상태로 옮깁니다. 지나간 틱이면 처음부터 다시 진행합니다. """
+        if tick < self.tick: self.restart()
+        while self.tick < tick and not self.done: self.step()
+
+    def result(self):
+        ship = self.ship
+        cause = "collision" if not ship.alive else "end"
+        return SimResult(self.replay.seed, ship.distance_traveled / 10, ship.time_alive, ship.fuel_used, ship.pods_collected, self.tick, cause)
+
+def check_replay(replay, max_ticks=REPLAY_MAX_TICKS):
+    """ 리플레이가 이 프로그램의 설정으로 진행될 수 있는 판인지 확인합니다. 리플레이는 클라이언트가 만든 파일이므로
+    맵·물리 설정은 적용하지 않고 지금 설정(world_params)과 같아야 하며, 고를 수 있는 것은 WORLD_MODE뿐입니다.
+    업그레이드는 기본값에서 upgrade_effects 단위로 올려 UPGRADE_LIMITS 안에 있어야 합니다. 틀리면 ValueError. """
+    if not isinstance(replay.seed, int) or isinstance(replay.seed, bool): raise ValueError("seed must be an integer")
+    if len(replay.masks) > max_ticks: raise ValueError(f"replay too long ({len(replay.masks)} ticks)")
+    if not isinstance(replay.params, dict) or replay.params.get("WORLD_MODE") not in WORLD_MODES:
+        raise ValueError("unknown WORLD_MODE")
+    expected = dict(world_params(), WORLD_MODE=replay.params["WORLD_MODE"])
+    if replay.params != expected:
+        names = sorted(name for name in set(expected) | set(replay.params) if replay.params.get(name) != expected.get(name))
+        raise ValueError(f"world settings differ: {', '.join(map(str, names))}")
+    if not isinstance(replay.upgrades, dict) or set(replay.upgrades) != set(UPGRADE_LIMITS):
+        raise ValueError("upgrades must list exactly " + ", ".join(UPGRADE_LIMITS))
+    for key, value in replay.upgrades.items():
+        steps, rest = divmod(value - UPGRADE_DEFAULTS[key], upgrade_effects[key]) if type(value) is int else (-1, 0)
+        if steps < 0 or rest or value > UPGRADE_LIMITS[key]: raise ValueError(f"invalid upgrade {key}={value!r}")
+
+def verify_replay(replay):
+    """ 리플레이를 check_replay로 확인한 다음 창 없이 끝까지 다시 진행해 SimResult를 돌려줍니다.
+    cause는 "collision" 또는 "end"(기록 끝). """
+    check_replay(replay)
+    saved = apply_world_params({"WORLD_MODE": replay.params["WORLD_MODE"]})
+    try:
+        player = ReplayPlayer(replay)
+        player.seek(len(replay.masks))
+        return player.result()
+    finally:
+        apply_world_params(saved)
+
+def save_replay(replay):
+    """ 사용자 데이터 폴더의 REPLAY_DIR에 리플레이를 저장하고 오래된 파일은 REPLAY_KEEP개만 남기고 지웁니다.
+    게임 중에는 프로필 저장소의 작업 스레드(record_run)가 부릅니다. """
+    folder = os.path.join(user_data_dir(), REPLAY_DIR)
+    os.makedirs(folder, exist_ok=True)
+    path = replay.save(os.path.join(folder, f"replay_{time.strftime('%Y%m%d_%H%M%S')}_{replay.seed:x}.ggr"))
+    old = sorted(name for name in os.listdir(folder) if name.endswith(".ggr"))[:-REPLAY_KEEP]
+    for name in old: os.remove(os.path.join(folder, name))
+    return path
+
+def verify_main(argv=None):
+    """ 리플레이 파일들을 다시 진행해 기록된 점수와 비교하고 결과를 JSON 한 줄씩 출력합니다. 하나라도 다르면 종료 코드 1. """
+    parser = argparse.ArgumentParser(description="Gravity Game 리플레이 검증")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="허용할 점수 차이")
+    args = parser.parse_args(argv)
+    failed = 0
+    for path in args.paths:
+        try:
+            replay = Replay.load(path, REPLAY_MAX_TICKS)
+            result = verify_replay(replay)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(json.dumps({"path": path, "error": str(e), "ok": False}))
+            continue
+        claimed = replay.info.get("score")
+        ok = isinstance(claimed, (int, float)) and abs(result.score - claimed) <= args.tolerance
+        failed += not ok
+        print(json.dumps({"path": path, "player": replay.info.get("player"), "claimed": claimed, **result._asdict(), "ok": ok}))
+    return 1 if failed else 0
+
 def draw_button(surface, rect, text, mouse_pos):
     color = (150, 150, 255) if rect.collidepoint(mouse_pos) else (100, 100, 255)
     pygame.draw.rect(surface, color, rect)
     pygame.draw.rect(surface, WHITE, rect, 2)
-    font = pygame.font.Font(font_path, 36)
-    text_surf = font.render(text, True, WHITE)
+    text_surf = render_text(text, 36)
     surface.blit(text_surf, text_surf.get_rect(center=rect.center))
 
 def draw_menu(surface, mouse_pos):
     global start_button_rect, instructions_button_rect, upgrade_button_rect, quit_button_rect, highscore
-    font = pygame.font.Font(font_path, 72)
-    small_font = pygame.font.Font(font_path, 28)
-    title_surf = font.render("Gravity Game", True, WHITE)
+    title_surf = render_text("Gravity Game", 72)
     surface.blit(title_surf, title_surf.get_rect(center=(WIDTH // 2, HEIGHT // 3 - 50)))
     start_button_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 70, 200, 50)
     instructions_button_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2, 200, 50)
@@ -308,30 +1800,28 @@ def draw_menu(surface, mouse_pos):
     draw_button(surface, instructions_button_rect, "게임 설명", mouse_pos)
     draw_button(surface, upgrade_button_rect, "업그레이드", mouse_pos)
     draw_button(surface, quit_button_rect, "게임 종료", mouse_pos)
-    highscore_text = small_font.render(f"최고 기록: {int(highscore)}", True, WHITE)
+    highscore_text = render_text(f"최고 기록: {int(highscore)}", 28)
     surface.blit(highscore_text, (20, HEIGHT - 40))
 
 def draw_instructions(surface, mouse_pos):
     global back_button_rect
-    font, title_font = pygame.font.Font(font_path, 28), pygame.font.Font(font_path, 48)
     y, line_height = 50, 35
-    title_surf = title_font.render("게임 설명", True, WHITE)
+    title_surf = render_text("게임 설명", 48)
     surface.blit(title_surf, (WIDTH // 2 - title_surf.get_width() // 2, 10))
     planets_info = [("빨간 행성", RED_COLOR, "가장 강한 중력"), ("초록 행성", GREEN_COLOR, "중간 중력"), ("파란 행성", BLUE_COLOR, "가장 약한 중력")]
     for name, color, desc in planets_info:
         pygame.draw.circle(surface, color, (120, y + 10), PLANET_RADIUS // 2)
-        surface.blit(font.render(name, True, WHITE), (170, y))
-        surface.blit(font.render(desc, True, WHITE), (170, y + 30)); y += 70
+        surface.blit(render_text(name, 28), (170, y))
+        surface.blit(render_text(desc, 28), (170, y + 30)); y += 70
     fuel_text = ["우주선은 연료를 사용해 움직입니다.", "연료가 다 떨어지면 움직일 수 없습니다.", "맵 곳곳의 연료 탱크로 보충 가능합니다."]
-    for line in fuel_text: surface.blit(font.render(line, True, WHITE), (50, y)); y += line_height
+    for line in fuel_text: surface.blit(render_text(line, 28), (50, y)); y += line_height
     back_button_rect = pygame.Rect(WIDTH - 120, HEIGHT - 60, 110, 40)
     draw_button(surface, back_button_rect, "뒤로가기", mouse_pos)
 
 def draw_upgrade_menu(surface, mouse_pos):
     global back_button_rect, upgrade_button_areas
-    font, title_font = pygame.font.Font(font_path, 28), pygame.font.Font(font_path, 48)
     surface.fill(BLACK)
-    title_surf = title_font.render("업그레이드", True, WHITE)
+    title_surf = render_text("업그레이드", 48)
     surface.blit(title_surf, (WIDTH // 2 - title_surf.get_width() // 2, 20))
     names = {"max_fuel": "연료 최대치", "fuel_pod_recharge": "연료 회복량", "thrust": "추진력"}
     prices = {"max_fuel": get_max_fuel_price, "fuel_pod_recharge": get_fuel_pod_price, "thrust": get_thrust_price}
@@ -343,19 +1833,19 @@ def draw_upgrade_menu(surface, mouse_pos):
         rect = pygame.Rect(WIDTH // 2 - 180, y, 360, 50)
         color = (100, 100, 255) if rect.collidepoint(mouse_pos) else (80, 80, 180)
         pygame.draw.rect(surface, color, rect); pygame.draw.rect(surface, WHITE, rect, 2)
-        surface.blit(font.render(text, True, WHITE), font.render(text, True, WHITE).get_rect(center=rect.center))
+        text_surf = render_text(text, 28)
+        surface.blit(text_surf, text_surf.get_rect(center=rect.center))
         upgrade_button_areas[key] = rect
-    coin_surf = font.render(f"현재 코인: {upgrade_data['points']}", True, WHITE)
+    coin_surf = render_text(f"현재 코인: {upgrade_data['points']}", 28)
     surface.blit(coin_surf, (20, HEIGHT - 60))
     back_button_rect = pygame.Rect(WIDTH - 120, HEIGHT - 60, 110, 40)
     draw_button(surface, back_button_rect, "뒤로가기", mouse_pos)
 
 def draw_game_over(surface, mouse_pos, score):
     global restart_button_rect
-    font, small_font = pygame.font.Font(font_path, 48), pygame.font.Font(font_path, 32)
-    text_surf = font.render("게임 오버", True, EXPLOSION_COLOR)
+    text_surf = render_text("게임 오버", 48, EXPLOSION_COLOR)
     surface.blit(text_surf, text_surf.get_rect(center=(WIDTH // 2, HEIGHT // 3)))
-    score_surf = small_font.render(f"점수: {int(score)}", True, WHITE)
+    score_surf = render_text(f"점수: {int(score)}", 32)
     surface.blit(score_surf, score_surf.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
     restart_button_rect = pygame.Rect(WIDTH // 2 - 120, HEIGHT // 2 + 80, 240, 50)
     draw_button(surface, restart_button_rect, "메뉴로 돌아가기", mouse_pos)
@@ -365,42 +1855,106 @@ def draw_fuel_bar(surface, fuel):
     fuel_ratio = fuel / upgrade_data["max_fuel"]
     pygame.draw.rect(surface, (50, 50, 50), (x, y, bar_width, bar_height))
     pygame.draw.rect(surface, (0, 255, 0), (x, y, bar_width * fuel_ratio, bar_height))
-    fuel_text = game_font.render(f"연료: {int(fuel)}/{upgrade_data['max_fuel']}", True, WHITE)
+    fuel_text = render_text(f"연료: {int(fuel)}/{upgrade_data['max_fuel']}", 30)
     surface.blit(fuel_text, (x + 5, y + 22))
 
 def draw_score(surface, score):
-    score_text = game_font.render(f"{player_name} 점수: {int(score)}", True, WHITE)
+    score_text = render_text(f"{player_name} 점수: {int(score)}", 30)
     surface.blit(score_text, (WIDTH - 250, 10))
 
+def replay_main(path):
+    """ 리플레이를 화면에 재생합니다. 스페이스: 일시정지, ↑/↓: 배속, ←/→: REPLAY_SEEK_SECONDS초 뒤/앞으로, Home: 처음으로. """
+    global player_name
+    replay = Replay.load(path)
+    apply_world_params(replay.params)
+    upgrade_data.update(replay.upgrades)
+    player_name = replay.info.get("player", "")
+    init_display()
+    player = ReplayPlayer(replay)
+    speed_index, paused, accumulator = REPLAY_SPEEDS.index(1), False, 0.0
+    total_time = len(replay.masks) * PHYSICS_DT
+    resize = ResizeDebouncer()
+    running = True
+    while running:
+        dt = clock.tick(TARGET_FPS) / 1000
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: running = False
+            elif event.type == pygame.VIDEORESIZE: resize.push((event.w, event.h))
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE: running = False
+                elif event.key == pygame.K_SPACE: paused = not paused
+                elif event.key == pygame.K_UP: speed_index = min(speed_index + 1, len(REPLAY_SPEEDS) - 1)
+                elif event.key == pygame.K_DOWN: speed_index = max(speed_index - 1, 0)
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    offset = round(REPLAY_SEEK_SECONDS / PHYSICS_DT) * (1 if event.key == pygame.K_RIGHT else -1)
+                    player.seek(max(0, player.tick + offset))
+                    accumulator = 0.0
+                elif event.key == pygame.K_HOME:
+                    player.restart()
+                    accumulator = 0.0
+        size = resize.poll()
+        if size: resize_window(size)
+        if not paused and not player.done:
+            accumulator += min(dt, MAX_FRAME_TIME) * REPLAY_SPEEDS[speed_index]
+            while accumulator >= PHYSICS_DT and not player.done:
+                player.step()
+                accumulator -= PHYSICS_DT
+        ship = player.ship
+        ship_pos = player.prev_ship_pos.lerp(ship.pos, min(accumulator / PHYSICS_DT, 1.0))
+        draw_background(screen)
+        draw_world(screen, ship, player.planets, player.fuelpods, ship_pos, ship_pos)
+        draw_warning(screen, ship, player.planets, ship_pos)
+        draw_minimap(screen, ship, player.planets, player.fuelpods)
+        if ship.bounded: draw_map_boundary_warning(screen, ship_pos)
+        draw_fuel_bar(screen, ship.fuel)
+        draw_score(screen, ship.distance_traveled / 10)
+        state = "  끝" if player.done else "  일시정지" if paused else ""
+        status = render_text(f"리플레이 {player.tick * PHYSICS_DT:.1f} / {total_time:.1f}초  x{REPLAY_SPEEDS[speed_index]:g}{state}", 24)
+        screen.blit(status, (10, HEIGHT - 60))
+        screen.blit(render_text("스페이스 일시정지  ↑↓ 배속  ←→ 이동  Home 처음으로", 20), (10, HEIGHT - 30))
+        pygame.display.flip()
+    pygame.quit()
+    sys.exit()
+
 def main():
-    global game_state, upgrade_button_areas, ship, planets, fuelpods, game_over, explosion_timer, shake_timer, highscore, fullscreen, player_name, input_text, WIDTH, HEIGHT, screen, space_bg
+    global game_state, upgrade_button_areas, ship, planets, fuelpods, universe, stepper, game_over, explosion_timer, shake_timer, highscore, fullscreen, player_name, input_text
     fullscreen, player_name, input_text, game_state = False, "", "", "enter_name"
     upgrade_button_areas, score = {}, 0
+    resize = ResizeDebouncer()
+    init_display()
     reset_game()
+    store = get_profile_store()
+    get_score_submitter()
     highscore = load_highscore()
     running = True
     while running:
-        dt = clock.tick(60) / 1000
+        dt = clock.tick(TARGET_FPS) / 1000
+        profiler.begin_frame()
         mouse_pos = pygame.mouse.get_pos()
         for event in pygame.event.get():
             if event.type == pygame.QUIT: running = False
-            elif event.type == pygame.VIDEORESIZE:
-                WIDTH, HEIGHT = event.w, event.h
-                mode = pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE
-                screen = pygame.display.set_mode((WIDTH, HEIGHT), mode)
-                bg_img = pygame.image.load(resource_path("space_background.jpg")).convert()
-                space_bg = pygame.transform.scale(bg_img, (WIDTH, HEIGHT))
+            elif event.type == pygame.VIDEORESIZE: resize.push((event.w, event.h))
             elif event.type == pygame.KEYDOWN:
                 if game_state == "enter_name":
                     if event.key == pygame.K_RETURN:
                         player_name = input_text.strip()
-                        if player_name: game_state = "menu"
+                        if player_name:
+                            profile = store.load_profile(player_name)
+                            upgrade_data.update(profile["upgrades"])
+                            highscore = profile["highscore"]
+                            game_state = "menu"
                     elif event.key == pygame.K_BACKSPACE: input_text = input_text[:-1]
                     elif len(input_text) < 12 and event.unicode.isprintable(): input_text += event.unicode
                 if event.key == pygame.K_F11:
                     fullscreen = not fullscreen
-                    mode = pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE
-                    screen = pygame.display.set_mode((WIDTH, HEIGHT), mode)
+                    resize_window((WIDTH, HEIGHT), fullscreen)
+                elif event.key == pygame.K_F3: profiler.toggle()
+                elif event.key == pygame.K_F4 and profiler.enabled:
+                    try:
+                        base = os.path.join(user_data_dir(), f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+                        print(f"프로파일 저장: {profiler.export(base + '.json')}, {profiler.export(base + '.csv')}")
+                    except OSError as e:
+                        print(f"프로파일 저장에 실패했습니다: {e}")
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if game_state == "menu":
                     if start_button_rect.collidepoint(mouse_pos): reset_game(); game_state = "playing"
@@ -417,26 +1971,27 @@ def main():
                                 if upgrade_data["points"] >= price and upgrade_data[key] < UPGRADE_LIMITS[key]:
                                     upgrade_data["points"] -= price
                                     upgrade_data[key] += upgrade_effects[key]
+                                    store.save_profile(player_name, upgrades=upgrade_data)
                 elif game_state == "game_over":
                     if restart_button_rect.collidepoint(mouse_pos): game_state = "menu"
 
-        screen.blit(space_bg, (0, 0))
+        size = resize.poll()
+        if size: resize_window(size, fullscreen)
+        draw_background(screen)
         if game_state == "enter_name":
-            font = pygame.font.Font(font_path, 40)
             screen.fill((0, 0, 30))
-            prompt = font.render("당신의 이름을 입력하세요:", True, WHITE)
-            name_display = font.render(input_text + "|", True, (200, 200, 0))
+            prompt = render_text("당신의 이름을 입력하세요:", 40)
+            name_display = render_text(input_text + "|", 40, (200, 200, 0))
             screen.blit(prompt, prompt.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 80)))
             screen.blit(name_display, name_display.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 20)))
         elif game_state == "menu": draw_menu(screen, mouse_pos)
         elif game_state == "instructions": draw_instructions(screen, mouse_pos)
         elif game_state == "upgrade": draw_upgrade_menu(screen, mouse_pos)
         elif game_state == "playing":
-            keys = pygame.key.get_pressed()
-            ship.update(planets, dt, keys)
-            for p in planets: p.update(dt)
-            for pod in fuelpods: pod.check_collect(ship)
-            if ship.alive and ship.check_collision(planets):
+            keys = KeyState.from_pressed(pygame.key.get_pressed())
+            with profiler.stage("physics"): collided = stepper.advance(dt, ship, planets, fuelpods, keys)
+            if universe is not None: planets, fuelpods = universe.follow(ship.pos)
+            if collided:
                 game_over, explosion_timer, shake_timer = True, 1.5, 0.3
             score = ship.distance_traveled / 10
             if not hasattr(ship, 'last_coin_score'): ship.last_coin_score = 0
@@ -444,29 +1999,45 @@ def main():
             if coin_diff > 0:
                 upgrade_data["points"] += coin_diff
                 ship.last_coin_score += coin_diff
-            camera_offset = pygame.Vector2(ship.pos)
+                store.save_profile(player_name, upgrades=upgrade_data)
+            ship_render_pos = stepper.ship_render_pos(ship)
+            camera_offset = pygame.Vector2(ship_render_pos)
             if shake_timer > 0:
                 shake_timer -= dt
                 camera_offset += pygame.Vector2(random.randint(-10, 10), random.randint(-10, 10))
-            for p in planets: p.draw(screen, camera_offset)
-            for pod in fuelpods: pod.draw(screen, camera_offset)
-            ship.draw(screen, camera_offset)
-            draw_warning(screen, ship, planets, camera_offset)
-            draw_minimap(screen, ship, planets, fuelpods)
-            draw_map_boundary_warning(screen, camera_offset)
-            draw_fuel_bar(screen, ship.fuel)
-            draw_score(screen, score)
+            with profiler.stage("draw_world"):
+                draw_world(screen, ship, planets, fuelpods, camera_offset, ship_render_pos)
+                draw_warning(screen, ship, planets, camera_offset)
+            with profiler.stage("minimap"): draw_minimap(screen, ship, planets, fuelpods)
+            with profiler.stage("hud"):
+                if ship.bounded: draw_map_boundary_warning(screen, camera_offset)
+                draw_fuel_bar(screen, ship.fuel)
+                draw_score(screen, score)
+            profiler.draw_overlay(screen, (f"drawn {render_stats.drawn}  culled {render_stats.culled}", f"text cache hit {text_cache.hits}  miss {text_cache.misses}"))
             if not ship.alive:
                 game_state = "game_over"
                 if score > highscore:
                     highscore = score
-                    save_highscore(score)
-                send_score_to_server(player_name, score)
+                    save_highscore(score, player_name)
+                replay.info.update(player=player_name, score=score)
+                store.record_run(player_name, score, ship.time_alive, ship.pods_collected, replay.seed, replay)
+                send_score_to_server(player_name, score, replay)
         elif game_state == "game_over":
             draw_game_over(screen, mouse_pos, score)
-        pygame.display.flip()
+        with profiler.stage("flip"): pygame.display.flip()
+        profiler.end_frame()
+    if score_submitter is not None: score_submitter.stop()
+    store.stop()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = sys.argv[1:]
+    if "--batch" in args:
+        batch_main([arg for arg in args if arg != "--batch"])
+    elif "--verify" in args:
+        sys.exit(verify_main([arg for arg in args if arg != "--verify"]))
+    else:
+        if "--infinite" in args: WORLD_MODE = "chunked"
+        if "--replay" in args: replay_main(args[args.index("--replay") + 1])
+        else: main()
\ No newline at end of file
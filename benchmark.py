@@ -0,0 +1,176 @@
+""" Gravity Game 성능 벤치마크.
+
+고정된 시드로 월드를 만들고 행성 배치, 중력 스텝, 충돌·연료 탱크 판정, 미니맵, 화면 밖 Surface에
+그리는 전체 프레임을 기본 / 10배 / 100배 행성 수에서 잽니다. 맵 넓이도 행성 수에 맞춰 늘려서
+밀도는 그대로 둡니다. 결과는 JSON으로 저장하고, 이전 결과와 비교해 임계값보다 느려진 항목이 있으면
+종료 코드 1로 끝납니다.
+
+    python benchmark.py --output bench_main.json
+    python benchmark.py --compare bench_main.json --threshold 0.10
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+
+import GravityGame as game
+
+SEED = 20240709
+SCALES = {"1x": 1, "10x": 10, "100x": 100}
+TICKS = 120 # 스텝·프레임 계열 항목에서 한 번 잴 때 진행하는 틱 수
+
+@contextmanager
+def scaled_world(scale):
+    """ 행성·연료 탱크 수를 scale배로, 맵 넓이도 scale배로 늘립니다. """
+    saved = game.MAP_SIZE, game.MAP_HALF, dict(game.PLANET_COUNTS), game.FUEL_POD_COUNT
+    game.MAP_SIZE = int(saved[0] * scale ** 0.5)
+    game.MAP_HALF = game.MAP_SIZE // 2
+    game.PLANET_COUNTS = {name: count * scale for name, count in saved[2].items()}
+    game.FUEL_POD_COUNT = saved[3] * scale
+    try:
+        yield
+    finally:
+        game.MAP_SIZE, game.MAP_HALF, game.PLANET_COUNTS, game.FUEL_POD_COUNT = saved
+
+def build_world(seed=SEED):
+    return game.create_world(random.Random(seed), dict(game.upgrade_data))
+
+def bench_generate_planets():
+    game.generate_planets(random.Random(SEED))
+    return 1
+
+def bench_ship_update(world):
+    ship, planets, fuelpods = world
+    keys = game.KeyState(game.KEY_RIGHT)
+    for _ in range(TICKS):
+        ship.update(planets, game.PHYSICS_DT, keys)
+        planets.update(game.PHYSICS_DT)
+    return TICKS
+
+def bench_collision_pods(world):
+    ship, planets, fuelpods = world
+    rng = np.random.default_rng(SEED)
+    for x, y in rng.uniform(-game.MAP_HALF, game.MAP_HALF, (TICKS, 2)).tolist():
+        ship.pos.update(x, y)
+        planets.update(game.PHYSICS_DT)
+        ship.check_collision(planets)
+        fuelpods.collect(ship)
+        ship.alive = True
+    return TICKS
+
+def bench_minimap(world, surface):
+    ship, planets, fuelpods = world
+    for i in range(TICKS):
+        ship.pos.x += 5
+        planets.update(game.PHYSICS_DT)
+        game.minimap.draw(surface, ship, planets, fuelpods, now=i * game.PHYSICS_DT)
+    return TICKS
+
+def bench_render_frame(world, surface):
+    ship, planets, fuelpods = world
+    for _ in range(TICKS):
+        ship.pos.x += 5
+        planets.update(game.PHYSICS_DT)
+        camera_offset = pygame.Vector2(ship.pos)
+        game.draw_background(surface)
+        game.draw_world(surface, ship, planets, fuelpods, camera_offset)
+        game.draw_warning(surface, ship, planets, camera_offset)
+        game.draw_minimap(surface, ship, planets, fuelpods)
+        game.draw_map_boundary_warning(surface, camera_offset)
+        game.draw_fuel_bar(surface, ship.fuel)
+        game.draw_score(surface, ship.distance_traveled / 10)
+    return TICKS
+
+def measure(run, setup, repeat, budget, warmup=True):
+    """ setup()으로 매번 같은 상태를 만든 뒤 run(state)을 잽니다. 작업 하나당 밀리초를 돌려줍니다. """
+    if warmup: run(setup()) # 캐시·지연 로딩을 미리 채웁니다
+    samples, started = [], time.perf_counter()
+    while len(samples) < repeat and (not samples or time.perf_counter() - started < budget):
+        state = setup()
+        start = time.perf_counter()
+        ops = run(state)
+        samples.append((time.perf_counter() - start) * 1000 / ops)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "mean_ms": statistics.fmean(samples), "runs": len(samples)}
+
+def run_benchmarks(scales, repeat, budget, only=None):
+    game.WIDTH, game.HEIGHT = 800, 600
+    game.init_display()
+    game.resources.wait()
+    game.player_name = "bench"
+    surface = pygame.Surface((game.WIDTH, game.HEIGHT)).convert()
+    cases = {
+        "generate_planets": (lambda _: bench_generate_planets(), lambda: None, False),
+        "ship_update": (bench_ship_update, build_world, True),
+        "collision_pods": (bench_collision_pods, build_world, True),
+        "minimap": (lambda world: bench_minimap(world, surface), build_world, True),
+        "render_frame": (lambda world: bench_render_frame(world, surface), build_world, True),
+    }
+    results = {}
+    for scale_name in scales:
+        with scaled_world(SCALES[scale_name]):
+            for case_name, (run, setup, warmup) in cases.items():
+                if only and case_name not in only: continue
+                key = f"{case_name}@{scale_name}"
+                game.minimap = game.Minimap()
+                results[key] = measure(run, setup, repeat, budget, warmup)
+                print(f"{key:<28} {results[key]['median_ms']:10.4f} ms/op  ({results[key]['runs']} runs)", file=sys.stderr)
+    return results
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__, "pygame": pygame.version.ver,
+            "machine": platform.machine(), "platform": platform.platform(), "seed": SEED, "ticks": TICKS}
+
+def compare(results, baseline, threshold):
+    """ baseline보다 median이 threshold 비율 이상 느려진 항목 목록. """
+    regressions = []
+    for key, result in sorted(results.items()):
+        old = baseline.get("results", {}).get(key)
+        if old is None: continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] > 0 else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{key:<28} {old['median_ms']:10.4f} -> {result['median_ms']:10.4f} ms/op  x{ratio:5.2f} {flag}", file=sys.stderr)
+        if flag: regressions.append(key)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(SCALES), help="쉼표로 구분한 규모 (기본: 1x,10x,100x)")
+    parser.add_argument("--only", default="", help="쉼표로 구분한 항목 이름만 실행")
+    parser.add_argument("--repeat", type=int, default=5, help="항목별 최대 측정 횟수")
+    parser.add_argument("--budget", type=float, default=10.0, help="항목별 측정 시간 한도(초). 최소 한 번은 잽니다")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본: stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="이 비율 이상 느려지면 회귀로 봅니다")
+    args = parser.parse_args(argv)
+    scales = [s for s in args.scales.split(",") if s]
+    only = {s for s in args.only.split(",") if s}
+    report = {"meta": metadata(), "results": run_benchmarks(scales, args.repeat, args.budget, only)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f: baseline = json.load(f)
+        regressions = compare(report["results"], baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)}개 항목이 {args.threshold:.0%} 이상 느려졌습니다: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
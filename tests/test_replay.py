@@ -0,0 +1,51 @@
+""" 저장소에 넣어 둔 리플레이를 다시 진행해 기록된 점수와 비트 단위로 같은지 확인합니다.
+물리·맵 생성을 바꿔 점수가 달라지는 것이 의도한 변경이면 `python tests/test_replay.py`로 다시 만듭니다. """
+import os
+import random
+import sys
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import GravityGame as game
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# (파일 이름, 시드, WORLD_MODE)
+REPLAYS = [("replay_box.ggr", 20240609, "box"), ("replay_chunked.ggr", 20240628, "chunked")]
+
+@pytest.mark.parametrize("name", [name for name, _, _ in REPLAYS])
+def test_replay_reproduces_recorded_score(name):
+    replay = game.Replay.load(os.path.join(FIXTURES, name), game.REPLAY_MAX_TICKS)
+    result = game.verify_replay(replay)
+    assert result.ticks == len(replay.masks)
+    assert result.score == replay.info["score"]
+    assert result.pods_collected == replay.info["pods_collected"]
+
+def test_verify_main_accepts_fixtures(capsys):
+    assert game.verify_main([os.path.join(FIXTURES, name) for name, _, _ in REPLAYS] + ["--tolerance", "0"]) == 0
+
+def record(seed, world_mode, max_time=60.0):
+    """ escape_policy에 주기적인 추진을 섞어 한 판을 진행하며 리플레이를 만듭니다. """
+    replay = game.Replay(seed, params=dict(game.world_params(), WORLD_MODE=world_mode))
+    saved = game.apply_world_params({"WORLD_MODE": world_mode})
+    try:
+        ship, planets, fuelpods, universe = game.start_world(random.Random(seed), dict(game.upgrade_data, **replay.upgrades))
+        while ship.alive and ship.time_alive < max_time:
+            if universe is not None: planets, fuelpods = universe.follow(ship.pos)
+            tick = len(replay.masks)
+            mask = game.escape_policy(ship, planets, fuelpods) | (game.KEY_RIGHT if tick // 90 % 3 else game.KEY_UP)
+            replay.record(mask)
+            game.step_world(ship, planets, fuelpods, game.KeyState(mask), game.PHYSICS_DT)
+    finally:
+        game.apply_world_params(saved)
+    result = game.verify_replay(replay)
+    replay.info = {"player": "fixture", "score": result.score, "pods_collected": result.pods_collected}
+    return replay
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURES, exist_ok=True)
+    for name, seed, world_mode in REPLAYS:
+        replay = record(seed, world_mode)
+        replay.save(os.path.join(FIXTURES, name))
+        print(name, len(replay.masks), "ticks", replay.info)
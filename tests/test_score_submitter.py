@@ -0,0 +1,124 @@
+""" ScoreSubmitter를 로컬 http.server 스텁 서버에 붙여 확인합니다. """
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import GravityGame as game
+
+class StubServer:
+    """ /add_scores, /add_score 요청을 기록하고 self.respond(path, body)가 돌려준 상태 코드로 답합니다. """
+    def __init__(self, respond):
+        self.respond, self.requests = respond, []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append((self.path, body))
+                self.send_response(stub.respond(self.path, body))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    servers = []
+    def start(respond):
+        servers.append(StubServer(respond))
+        return servers[-1]
+    yield start
+    for server in servers: server.close()
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(game, "SCORE_RETRY_BASE", 0.05)
+
+def make_submitter(url, tmp_path, **kwargs):
+    return game.ScoreSubmitter(url, outbox_path=str(tmp_path / "outbox.json"), **kwargs)
+
+def submit_all(submitter, names):
+    # 작업 스레드가 중간에 묶음을 가져가지 않도록 큐를 한 번에 채웁니다
+    with submitter.condition:
+        for name in names: submitter.submit(name, 100)
+
+def read_outbox(tmp_path):
+    with open(tmp_path / "outbox.json", encoding="utf-8") as f: return json.load(f)
+
+def test_batches_scores_when_supported(stub, tmp_path):
+    server = stub(lambda path, body: 200)
+    submitter = make_submitter(server.url, tmp_path)
+    submit_all(submitter, ["a", "b", "c"])
+    assert submitter.flush(5)
+    submitter.stop()
+    assert [path for path, _ in server.requests] == ["/add_scores"]
+    assert [e["name"] for e in server.requests[0][1]["scores"]] == ["a", "b", "c"]
+    assert read_outbox(tmp_path) == []
+
+def test_falls_back_to_single_scores(stub, tmp_path):
+    server = stub(lambda path, body: 404 if path == "/add_scores" else 200)
+    submitter = make_submitter(server.url, tmp_path)
+    submit_all(submitter, ["a", "b"])
+    assert submitter.flush(5)
+    submitter.stop()
+    assert [(path, body.get("name")) for path, body in server.requests] == [("/add_scores", None), ("/add_score", "a"), ("/add_score", "b")]
+    assert submitter.batch_supported is False
+
+def test_rejected_score_does_not_block_the_queue(stub, tmp_path):
+    server = stub(lambda path, body: 400 if path == "/add_scores" or body["name"] == "bad" else 200)
+    submitter = make_submitter(server.url, tmp_path)
+    submit_all(submitter, ["bad", "a", "b"])
+    assert submitter.flush(5)
+    submitter.stop()
+    assert [body["name"] for path, body in server.requests if path == "/add_score"] == ["bad", "a", "b"]
+    assert submitter.pending == [] and submitter.failures == 0
+    assert read_outbox(tmp_path) == []
+
+def test_retries_server_errors(stub, tmp_path):
+    statuses = iter([503, 503, 429])
+    server = stub(lambda path, body: next(statuses, 200))
+    submitter = make_submitter(server.url, tmp_path)
+    submitter.submit("a", 100)
+    assert submitter.flush(5)
+    submitter.stop()
+    assert len(server.requests) == 4
+    assert submitter.failures == 0
+
+def test_unreachable_server_keeps_scores_in_outbox(tmp_path):
+    submitter = make_submitter("http://127.0.0.1:9", tmp_path)
+    submitter.submit("a", 100)
+    assert not submitter.flush(0.5)
+    submitter.stop()
+    assert [e["name"] for e in read_outbox(tmp_path)] == ["a"]
+    reloaded = make_submitter("http://127.0.0.1:9", tmp_path)
+    assert [e["name"] for e in reloaded.pending] == ["a"]
+    reloaded.stop()
+
+def test_stop_during_slow_send_writes_outbox(stub, tmp_path):
+    sending = threading.Event()
+    def slow(path, body):
+        sending.set()
+        time.sleep(1.0)
+        return 503
+    server = stub(slow)
+    submitter = make_submitter(server.url, tmp_path)
+    submitter.submit("first", 100)
+    assert sending.wait(5)
+    submitter.submit("second", 200)
+    submitter.stop(timeout=0.1)
+    assert [e["name"] for e in read_outbox(tmp_path)] == ["first", "second"]